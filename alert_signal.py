@@ -0,0 +1,55 @@
+from clock import ticks_ms, ticks_diff, ticks_add
+
+# Signal states
+IDLE = 0
+ON = 1
+OFF = 2
+
+class AlertSignaller:
+    """
+    Timer-driven blink state machine for the emergency signals
+    Instead of switching the signals on, sleeping and switching them off,
+    each phase gets a deadline and update() (called every loop iteration)
+    advances the phase once its deadline has passed. The loop therefore
+    keeps servicing buttons and telemetry for the whole emergency.
+    """
+    def __init__(self, signal_on, signal_off, on_ms=500, off_ms=100):
+        self.signal_on = signal_on    # Callable that activates the signals
+        self.signal_off = signal_off  # Callable that clears them
+        self.on_ms = on_ms
+        self.off_ms = off_ms
+        self.state = IDLE
+        self.deadline = 0
+
+    @property
+    def active(self):
+        return self.state != IDLE
+
+    def start(self):
+        """Begin blinking with an ON phase"""
+        if self.state == IDLE:
+            self._enter(ON, ticks_ms())
+
+    def update(self):
+        """Advance to the next phase when its deadline has passed"""
+        if self.state == IDLE:
+            return
+        now = ticks_ms()
+        if ticks_diff(now, self.deadline) < 0:
+            return
+        self._enter(OFF if self.state == ON else ON, now)
+
+    def stop(self):
+        """Stop blinking and leave the signals cleared"""
+        if self.state == ON:
+            self.signal_off()
+        self.state = IDLE
+
+    def _enter(self, state, now):
+        self.state = state
+        if state == ON:
+            self.signal_on()
+            self.deadline = ticks_add(now, self.on_ms)
+        else:
+            self.signal_off()
+            self.deadline = ticks_add(now, self.off_ms)
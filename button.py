@@ -0,0 +1,56 @@
+import machine
+from machine import Pin
+from clock import ticks_ms, ticks_diff, ticks_add
+
+class DebouncedButton:
+    """
+    Active-low push button serviced from a pin interrupt
+    The IRQ handler only records presses, so the control loop polls a
+    counter instead of the pin and never spins while the button is held.
+    Debouncing is time based: the first edge while the button is released
+    counts as a press, even if bounce makes the pin read high at that
+    moment, and the next edge after debounce_ms with the pin high is the
+    release. Edges within debounce_ms of the last accepted one are bounce
+    and ignored, without extending the window.
+    """
+    def __init__(self, pin, debounce_ms=50):
+        self.pin = pin
+        self.debounce_ms = debounce_ms
+        self.presses = 0           # Presses recorded by the IRQ but not yet consumed
+        self.pressed_at = 0        # Tick of the most recent accepted press
+        self._down = pin.value() == 0  # Between an accepted press and its release
+        self._last_edge = ticks_add(ticks_ms(), -debounce_ms)
+        pin.irq(trigger=Pin.IRQ_FALLING | Pin.IRQ_RISING, handler=self._on_edge)
+
+    def _on_edge(self, pin):
+        """IRQ handler, must not allocate or block"""
+        now = ticks_ms()
+        if ticks_diff(now, self._last_edge) < self.debounce_ms:
+            return  # Bounce of the last accepted edge
+        self._last_edge = now
+        if self._down and pin.value():
+            self._down = False
+            return
+        # A press, or a new one if the previous release fell within the bounce window
+        self._down = True
+        self.presses += 1
+        self.pressed_at = now
+
+    def pressed(self):
+        """Consume one pending press, returns True if there was one"""
+        if self._down and self.pin.value() and ticks_diff(ticks_ms(), self._last_edge) >= self.debounce_ms:
+            # Released during the bounce window of the press, its edge was ignored
+            irq_state = machine.disable_irq()
+            if ticks_diff(ticks_ms(), self._last_edge) >= self.debounce_ms:
+                self._down = False
+            machine.enable_irq(irq_state)
+        if not self.presses:
+            return False
+        irq_state = machine.disable_irq()
+        self.presses -= 1
+        machine.enable_irq(irq_state)
+        return True
+
+    def value(self):
+        """Current raw pin level (0 while pressed)"""
+        return self.pin.value()
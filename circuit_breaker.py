@@ -0,0 +1,75 @@
+from clock import ticks_ms, ticks_diff, ticks_add
+
+# Breaker states
+CLOSED = 0
+OPEN = 1
+HALF_OPEN = 2
+
+STATE_NAMES = ("closed", "open", "half_open")
+
+class CircuitBreaker:
+    """
+    Stops calling a server that keeps failing
+    After threshold consecutive failures the breaker opens and allow()
+    refuses every request for cooldown_ms, so callers fail at once instead
+    of waiting on a connect timeout each. The first request after the
+    cool-down is let through as a probe (half open) and the others are
+    refused until it reports back: success closes the breaker, failure
+    opens it for another cool-down. A probe that never reports back is
+    replaced by a new one after a cool-down.
+    """
+    def __init__(self, threshold=3, cooldown_ms=10000):
+        self.threshold = threshold
+        self.cooldown_ms = cooldown_ms
+        self.state = CLOSED
+        self.failures = 0        # Consecutive failures
+        self.total_failures = 0
+        self.short_circuits = 0  # Requests refused while open
+        self.trips = 0           # Times the breaker opened
+        self.opened_at = 0
+        self.probing = False     # A half-open probe is outstanding
+        self.probe_at = 0
+
+    def allow(self):
+        """True if a request may be sent now"""
+        if self.state == CLOSED:
+            return True
+        now = ticks_ms()
+        if self.state == OPEN:
+            if ticks_diff(now, ticks_add(self.opened_at, self.cooldown_ms)) < 0:
+                self.short_circuits += 1
+                return False
+            self.state = HALF_OPEN
+        elif self.probing and ticks_diff(now, ticks_add(self.probe_at, self.cooldown_ms)) < 0:
+            self.short_circuits += 1
+            return False
+        self.probing = True
+        self.probe_at = now
+        return True
+
+    def success(self):
+        """Record a request that reached the server"""
+        self.failures = 0
+        self.state = CLOSED
+        self.probing = False
+
+    def failure(self):
+        """Record a failed request, opens the breaker at the threshold or after a failed probe"""
+        self.failures += 1
+        self.total_failures += 1
+        self.probing = False
+        if self.state == HALF_OPEN or self.failures >= self.threshold:
+            if self.state != OPEN:
+                self.trips += 1
+            self.state = OPEN
+            self.opened_at = ticks_ms()
+
+    def status(self):
+        """Breaker state and counters for monitoring"""
+        return {
+            "state": STATE_NAMES[self.state],
+            "failures": self.failures,
+            "total_failures": self.total_failures,
+            "short_circuits": self.short_circuits,
+            "trips": self.trips,
+        }
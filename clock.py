@@ -0,0 +1,29 @@
+"""
+Tick helpers shared by the firmware modules
+
+MicroPython provides wrapping millisecond and microsecond tick counters in
+the time module. On CPython (host tools and simulation) equivalent
+monotonic counters are provided so the same code runs unchanged.
+"""
+import time
+
+# Seconds to add to time.time() for Unix time, MicroPython on bare metal counts from 2000
+EPOCH_OFFSET = 946684800 if time.gmtime(0)[0] == 2000 else 0
+
+try:
+    ticks_ms = time.ticks_ms
+    ticks_us = time.ticks_us
+    ticks_diff = time.ticks_diff
+    ticks_add = time.ticks_add
+except AttributeError:
+    def ticks_ms():
+        return time.monotonic_ns() // 1000000
+
+    def ticks_us():
+        return time.monotonic_ns() // 1000
+
+    def ticks_diff(a, b):
+        return a - b
+
+    def ticks_add(a, delta):
+        return a + delta
@@ -0,0 +1,32 @@
+from clock import ticks_ms, ticks_diff
+
+class DeadbandFilter:
+    """
+    Exponentially smoothed reading that is only reported when it changes
+    Every sample moves the smoothed value by alpha of its distance to the
+    sample. update() returns the smoothed value when it has left the
+    deadband around the last reported value, or when max_interval_ms has
+    passed since the last report, and None otherwise. Steady readings are
+    therefore sent rarely, while a real change is sent with the next sample.
+    """
+    def __init__(self, deadband=0.5, alpha=0.3, max_interval_ms=300000):
+        self.deadband = deadband
+        self.alpha = alpha
+        self.max_interval_ms = max_interval_ms
+        self.value = None     # Smoothed value
+        self.reported = None  # Value of the last report
+        self.reported_at = 0
+
+    def update(self, sample):
+        """Add a sample, returns the smoothed value if it is due for reporting"""
+        if self.value is None:
+            self.value = float(sample)
+        else:
+            self.value += self.alpha * (sample - self.value)
+        now = ticks_ms()
+        if (self.reported is None or abs(self.value - self.reported) >= self.deadband
+                or ticks_diff(now, self.reported_at) >= self.max_interval_ms):
+            self.reported = self.value
+            self.reported_at = now
+            return self.value
+        return None
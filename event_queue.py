@@ -0,0 +1,46 @@
+import time
+
+class EventQueue:
+    """
+    Bounded in-memory buffer of pending PowerGoblin telemetry records
+    Each record keeps the time it was queued so a deferred flush preserves
+    both the original ordering and the original timestamps
+    """
+    def __init__(self, max_size=32, flush_size=8, flush_age=5):
+        self.max_size = max_size      # Hard bound on buffered records
+        self.flush_size = flush_size  # Flush once this many records are waiting
+        self.flush_age = flush_age    # Flush once the oldest record is this many seconds old
+        self.records = []
+        self.dropped = 0              # Records discarded because the buffer was full
+
+    def __len__(self):
+        return len(self.records)
+
+    def push(self, kind, args, timestamp=None):
+        """Add a record, dropping the oldest one if the buffer is full"""
+        if len(self.records) >= self.max_size:
+            self.records.pop(0)
+            self.dropped += 1
+        if timestamp is None:
+            timestamp = time.time()
+        self.records.append((timestamp, kind, args))
+
+    def should_flush(self, now=None):
+        """Check whether the size or age threshold has been reached"""
+        if not self.records:
+            return False
+        if len(self.records) >= self.flush_size:
+            return True
+        if now is None:
+            now = time.time()
+        return now - self.records[0][0] >= self.flush_age
+
+    def take(self, count=None):
+        """Remove and return up to count of the oldest records (all if count is None)"""
+        if count is None or count >= len(self.records):
+            batch = self.records
+            self.records = []
+        else:
+            batch = self.records[:count]
+            self.records = self.records[count:]
+        return batch
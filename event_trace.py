@@ -0,0 +1,148 @@
+import struct
+try:
+    import uos as os
+except ImportError:
+    import os
+from clock import ticks_ms, ticks_diff
+
+# Fixed-width trace record: milliseconds since the time base, event, detail, value
+_RECORD = "<IBBf"
+RECORD_SIZE = struct.calcsize(_RECORD)
+
+# The time base moves forward before ticks_diff (valid up to 2^29 ms on MicroPython)
+# runs out, about every 3.1 days
+_REBASE_MS = 1 << 28
+
+# Inputs
+BUTTON = 1        # Debounced door button press
+MOTION = 2        # Motion alert detected, value is the alert length in seconds
+TEMPERATURE = 3   # New temperature reading, detail 0 inside / 1 outside, value in C
+# Outputs
+DOOR = 4          # Door servo moved, detail 1 open / 0 closed
+FAN = 5           # Fan switched, detail 1 on / 0 off
+ALERT_END = 6     # Emergency signalling stopped
+TELEMETRY = 7     # PowerGoblin call, detail is the TELEMETRY_CALLS code
+# Time base
+START = 8         # Recorder opened (usually a boot), later records count from a new time base
+REBASE = 9        # Time base moved forward by the record's ms (detail 1: by an unknown gap)
+
+INPUTS = (BUTTON, MOTION, TEMPERATURE)
+EVENT_NAMES = {BUTTON: "button", MOTION: "motion", TEMPERATURE: "temperature", DOOR: "door",
+               FAN: "fan", ALERT_END: "alert_end", TELEMETRY: "telemetry", START: "start",
+               REBASE: "rebase"}
+
+# Detail codes of TELEMETRY records
+TELEMETRY_CALLS = {
+    "start_measurement": 1,
+    "stop_measurement": 2,
+    "start_run": 3,
+    "stop_run": 4,
+    "create_trigger": 5,
+    "add_custom_resource": 6,
+}
+
+class TraceRecorder:
+    """
+    Records control loop inputs and outputs to a compact binary file on flash
+    Records are packed into a preallocated buffer and appended to path once
+    buffer_records of them are waiting. When the file reaches max_bytes it
+    is renamed to path + ".1" (replacing the previous one) and a new file is
+    started, so the trace never holds more than about 2 * max_bytes.
+    Times are milliseconds since a time base: opening a recorder writes a
+    START record, and a REBASE record moves the base forward before the
+    tick difference could wrap, see read_records.
+    """
+    def __init__(self, path="trace.bin", max_bytes=65536, buffer_records=32):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.buf = bytearray(buffer_records * RECORD_SIZE)
+        self.pos = 0
+        self.records = 0
+        self.rotations = 0
+        self.started = ticks_ms()
+        try:
+            self.size = os.stat(path)[6]
+        except OSError:
+            self.size = 0
+        self._pack(0, START, 0, 0.0)
+
+    def record(self, event, detail=0, value=0.0):
+        """Add one record, allocation free until the buffer is written out"""
+        now = ticks_ms()
+        elapsed = ticks_diff(now, self.started)
+        if elapsed < 0 or elapsed >= _REBASE_MS:
+            # A negative difference means the ticks wrapped since the last record
+            self._pack(max(elapsed, 0), REBASE, 1 if elapsed < 0 else 0, 0.0)
+            self.started = now
+            elapsed = 0
+        self._pack(elapsed, event, detail, value)
+
+    def _pack(self, elapsed, event, detail, value):
+        struct.pack_into(_RECORD, self.buf, self.pos, elapsed, event, detail, value)
+        self.pos += RECORD_SIZE
+        self.records += 1
+        if self.pos == len(self.buf):
+            self.flush()
+
+    def flush(self):
+        """Append the buffered records to the trace file, rotating it when full"""
+        if not self.pos:
+            return
+        with open(self.path, "ab") as f:
+            f.write(memoryview(self.buf)[:self.pos])
+        self.size += self.pos
+        self.pos = 0
+        if self.size >= self.max_bytes:
+            try:
+                os.remove(self.path + ".1")
+            except OSError:
+                pass
+            os.rename(self.path, self.path + ".1")
+            self.size = 0
+            self.rotations += 1
+
+    def close(self):
+        self.flush()
+
+class NullTrace:
+    """
+    Drop-in replacement used when tracing is disabled, every call is a no-op
+    """
+    def record(self, event, detail=0, value=0.0):
+        pass
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+def read_records(data):
+    """
+    Decode trace bytes into a list of (ms, event, detail, value) tuples on one timeline
+    REBASE records are folded into the times and dropped. A START record begins a
+    new time base, which continues from the previous record, so a trace appended to
+    after a reboot keeps increasing times; split it with sessions().
+    """
+    records = []
+    base = last = 0
+    for i in range(len(data) // RECORD_SIZE):
+        ms, event, detail, value = struct.unpack_from(_RECORD, data, i * RECORD_SIZE)
+        if event == REBASE:
+            base = last if detail else base + ms
+            last = base
+            continue
+        if event == START:
+            base = last
+        last = base + ms
+        records.append((last, event, detail, value))
+    return records
+
+def sessions(records):
+    """Split read_records output at its START records, one list per recorder run"""
+    runs = []
+    for record in records:
+        if record[1] == START or not runs:
+            runs.append([])
+        runs[-1].append(record)
+    return runs
@@ -2,13 +2,15 @@ from machine import Pin, PWM
 import machine
 import time
 import dht
+from button import DebouncedButton
+from sensor_service import SensorService
 
 # Initialize Fan Control Pins
 INA = PWM(Pin(27, Pin.OUT), 10000)  # INA corresponds to IN+
 INB = PWM(Pin(18, Pin.OUT), 10000)  # INB corresponds to IN-
 
 # Initialize Button for door control
-button1 = Pin(26, Pin.IN, Pin.PULL_UP)  # Button for opening/closing the door
+button1 = DebouncedButton(Pin(26, Pin.IN, Pin.PULL_UP))  # Button for opening/closing the door
 
 # Initialize PWM for Servo (Door control)
 pwm = PWM(Pin(5))  
@@ -17,6 +19,14 @@ pwm.freq(50)
 #Associate DHT11 with Pin(17).
 DHT = dht.DHT11(machine.Pin(17))
 
+def read_dht_temperature():
+    DHT.measure()
+    return DHT.temperature()
+
+# Sample the DHT11 every 2 s into a cache instead of on every loop iteration
+sensors = SensorService()
+sensors.add("temperature", read_dht_temperature, 2000)
+
 
 # RGB colors (Red for brake light, for indication when door is open)
 
@@ -43,13 +53,9 @@ def control_door(open_door):
 door_open = False  # Initially, door is closed
 
 while True:
-    btnVal1 = button1.value()  # Read the button value (active low)
-    DHT.measure()
+    sensors.poll()
     
-    if btnVal1 == 0:  # Button pressed (active low)
-        time.sleep(0.01)  # Delay to debounce the button
-        while btnVal1 == 0:
-            btnVal1 = button1.value()  # Wait for button release
+    if button1.pressed():  # Press recorded and debounced by the button interrupt
         door_open = not door_open  # Toggle door state
         
         # Control the door based on the state
@@ -0,0 +1,42 @@
+import struct
+
+# Datagram layout shared by PowerGoblinManager's gateway client mode and the
+# host gateway: header, then the record fields separated by _SEP
+VERSION = 1
+_HEADER = "<BBHd"   # protocol version, record kind, sequence number, timestamp
+HEADER_SIZE = struct.calcsize(_HEADER)
+MAX_DATAGRAM = 256
+_SEP = b"\x1f"
+
+# Number of fields of each record kind (power_goblin_manager's TRIGGER, RESOURCE,
+# MEASUREMENT_START, MEASUREMENT_STOP, RUN_START and RUN_STOP)
+FIELDS = {1: 3, 2: 3, 3: 2, 4: 2, 5: 2, 6: 2}
+
+def encode_into(buf, kind, seq, timestamp, fields):
+    """Pack one record into buf, returns the datagram length, ValueError if it does not fit"""
+    struct.pack_into(_HEADER, buf, 0, VERSION, kind, seq & 0xFFFF, timestamp)
+    pos = HEADER_SIZE
+    end = len(buf)
+    for i, field in enumerate(fields):
+        data = str(field).encode("utf-8")
+        if pos + len(data) + (1 if i else 0) > end:
+            raise ValueError("record too long for a datagram")
+        if i:
+            buf[pos] = _SEP[0]
+            pos += 1
+        buf[pos:pos + len(data)] = data
+        pos += len(data)
+    return pos
+
+def decode(data):
+    """Unpack a datagram into (kind, sequence number, timestamp, fields), ValueError if malformed"""
+    if len(data) < HEADER_SIZE:
+        raise ValueError("short datagram")
+    version, kind, seq, timestamp = struct.unpack_from(_HEADER, data, 0)
+    if version != VERSION:
+        raise ValueError("unsupported datagram version")
+    payload = bytes(data[HEADER_SIZE:])
+    fields = tuple(str(field, "utf-8") for field in payload.split(_SEP))
+    if FIELDS.get(kind) != len(fields):
+        raise ValueError("unknown record kind or wrong number of fields")
+    return kind, seq, timestamp, fields
@@ -0,0 +1,167 @@
+import gc
+from clock import ticks_ms, ticks_us, ticks_diff
+
+# MicroPython reports the heap through gc.mem_free/gc.mem_alloc and takes the
+# automatic collection threshold in bytes, CPython has neither
+_mem_free = getattr(gc, "mem_free", None)
+_mem_alloc = getattr(gc, "mem_alloc", None)
+
+# Largest free block search: probes shrink by a quarter each step, at most this many
+_PROBE_STEPS = 8
+
+class HeapMonitor:
+    """
+    Heap statistics and scheduled garbage collection for the control loop
+    Call idle() where the loop is about to sleep. It collects once
+    collect_bytes have been allocated since the last collection (a quarter
+    of that while less than low_free_bytes are free), or after
+    max_interval_ms, so collection pauses fall in the idle slot instead of
+    inside a control stage. The automatic threshold is raised to twice
+    collect_bytes as a backstop, and collections the allocator still runs
+    between idle slots are counted. Every report_interval_ms the free and
+    allocated heap, the largest free block (up to probe_bytes, the largest
+    buffer the firmware needs), fragmentation and collection pauses are
+    reported as PowerGoblin custom resources when pgm is given (a
+    PowerGoblinManager or SmartHousePowerMonitor), or printed. The block
+    probe is skipped while the network worker, if given, has work.
+    """
+    def __init__(self, pgm=None, collect_bytes=8192, low_free_bytes=16384,
+                 max_interval_ms=10000, report_interval_ms=60000, probe_bytes=4096, worker=None):
+        self.pgm = pgm
+        self.probe_bytes = probe_bytes
+        self.worker = worker
+        self.collect_bytes = collect_bytes
+        self.low_free_bytes = low_free_bytes
+        self.max_interval_ms = max_interval_ms
+        self.report_interval_ms = report_interval_ms
+
+        # Counters, reset after each report
+        self.collections = 0       # Collections run by idle()
+        self.auto_collections = 0  # Collections the allocator ran on its own
+        self.pause_total_us = 0
+        self.pause_max_us = 0
+        self.largest_free = None   # Measured at each report the worker is idle
+
+        self._last_collect = self._last_report = ticks_ms()
+        self._alloc_after_collect = self._last_alloc = self.mem_alloc()
+        if _mem_alloc is not None:
+            gc.threshold(collect_bytes * 2)
+
+    def mem_free(self):
+        """Free heap in bytes, None where the port does not report it"""
+        return _mem_free() if _mem_free is not None else None
+
+    def mem_alloc(self):
+        """Allocated heap in bytes, None where the port does not report it"""
+        return _mem_alloc() if _mem_alloc is not None else None
+
+    def idle(self):
+        """Collect and report if due, returns True if a collection ran"""
+        now = ticks_ms()
+        due = ticks_diff(now, self._last_collect) >= self.max_interval_ms
+        alloc = self.mem_alloc()
+        if alloc is not None:
+            if alloc < self._last_alloc:
+                self.auto_collections += 1  # The heap shrank without idle() collecting
+            self._last_alloc = alloc
+            budget = self.collect_bytes
+            if _mem_free() < self.low_free_bytes:
+                budget //= 4
+            due = due or alloc - self._alloc_after_collect >= budget
+        if due:
+            self.collect()
+        if ticks_diff(now, self._last_report) >= self.report_interval_ms:
+            self._last_report = now
+            self.report()
+            self.reset()
+        return due
+
+    def collect(self):
+        """Run a timed collection, returns the pause in microseconds"""
+        started = ticks_us()
+        gc.collect()
+        pause = ticks_diff(ticks_us(), started)
+        self.collections += 1
+        self.pause_total_us += pause
+        if pause > self.pause_max_us:
+            self.pause_max_us = pause
+        self._last_collect = ticks_ms()
+        self._alloc_after_collect = self._last_alloc = self.mem_alloc()
+        return pause
+
+    def largest_free_block(self):
+        """
+        Largest allocatable block in bytes up to probe_bytes, within a quarter
+        Probes start at probe_bytes and shrink until one fits. Collection is
+        disabled meanwhile, so a failed probe fails at once instead of making
+        the allocator collect, and the one probe that fits is garbage until the
+        next collection. None where the port does not report the heap.
+        """
+        if _mem_free is None:
+            return None
+        size = min(self.probe_bytes, _mem_free())
+        found = 0
+        gc.disable()
+        try:
+            for _ in range(_PROBE_STEPS):
+                try:
+                    block = bytearray(size)
+                    del block
+                    found = size
+                    break
+                except MemoryError:
+                    size = size * 3 // 4
+        finally:
+            gc.enable()
+        return found
+
+    def stats(self):
+        """Heap and collection figures of the current report interval"""
+        free = self.mem_free()
+        largest = self.largest_free
+        return {
+            "heap_free": free,
+            "heap_alloc": self.mem_alloc(),
+            "heap_largest_free": largest,
+            # Share of the free heap that cannot be allocated in one block, known only
+            # when the largest block is smaller than the probe limit
+            "heap_fragmentation_pct": ((free - largest) * 100 // free
+                                       if free and largest is not None
+                                       and largest < min(self.probe_bytes, free) else None),
+            "gc_collections": self.collections,
+            "gc_auto_collections": self.auto_collections if free is not None else None,
+            "gc_pause_max_us": self.pause_max_us,
+            "gc_pause_mean_us": self.pause_total_us // self.collections if self.collections else 0,
+        }
+
+    def report(self):
+        """Measure the largest free block, then send the stats to PowerGoblin or print them"""
+        worker = self.worker
+        if worker is None or not (worker.busy or len(worker)):
+            self.largest_free = self.largest_free_block()
+        else:
+            self.largest_free = None  # Not measured this interval
+        stats = self.stats()
+        if self.pgm is None:
+            print(" ".join(f"{name}={value}" for name, value in stats.items() if value is not None))
+            return
+        for name, value in stats.items():
+            if value is not None:
+                self.pgm.add_custom_resource(name, str(value))
+
+    def reset(self):
+        """Clear the collection counters"""
+        self.collections = 0
+        self.auto_collections = 0
+        self.pause_total_us = 0
+        self.pause_max_us = 0
+
+class NullHeapMonitor:
+    """
+    Drop-in replacement used when heap management is disabled, every call is a no-op
+    """
+    def idle(self):
+        return False
+
+    def collect(self):
+        return 0
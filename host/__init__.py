@@ -0,0 +1,17 @@
+"""
+Host-side (CPython) tooling for the smart house project
+
+Importing this package puts the device modules in the repository root and
+the MicroPython stand-ins in host/sim on sys.path, so the firmware code can
+be imported and exercised unchanged on a development machine.
+"""
+import os
+import sys
+
+HOST_DIR = os.path.dirname(os.path.abspath(__file__))
+SIM_DIR = os.path.join(HOST_DIR, "sim")
+ROOT_DIR = os.path.dirname(HOST_DIR)
+
+for _path in (ROOT_DIR, SIM_DIR):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
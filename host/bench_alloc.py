@@ -0,0 +1,71 @@
+"""
+Measure heap allocation per PowerGoblinManager telemetry call
+
+For each client configuration the same create_trigger/add_custom_resource
+sequence is issued against a fake PowerGoblin server (in a child process,
+so its own allocations are not counted) while
+tracemalloc records the transient heap high-water mark of every call.
+This approximates the garbage produced per call, which is what drives
+collection pauses on the ESP32 heap (where gc.mem_alloc deltas measure it
+directly).
+
+    python -m host.bench_alloc [calls]
+"""
+import sys
+import tracemalloc
+
+import host  # noqa: F401  (sets up sys.path)
+from host.fake_goblin import spawn
+import ujson as json
+from power_goblin_manager import PowerGoblinManager
+
+CONFIGS = (
+    ("urequests", {}),
+    ("keep-alive", {"keep_alive": True}),
+    ("low-alloc", {"keep_alive": True, "low_alloc": True}),
+    ("forget", {"keep_alive": True, "low_alloc": True, "fire_and_forget": True}),
+)
+
+def measure(fn, calls):
+    """Average transient and retained bytes allocated per call of fn"""
+    fn()  # Warm up caches and the connection
+    transient = 0
+    tracemalloc.start()
+    start, _ = tracemalloc.get_traced_memory()
+    for _ in range(calls):
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+        transient += peak - before
+    end, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return transient / calls, (end - start) / calls
+
+def build_payload(pgm):
+    """Serialize a trigger body the way the configured client does"""
+    if pgm.low_alloc:
+        return pgm._trigger_body("Motion", "Motion detected", "ESP32", None)
+    return json.dumps({"triggerType": "Motion", "unit": "ESP32",
+                       "message": "Motion detected", "type": "trigger"})
+
+def main(calls=200):
+    server, address = spawn()
+    try:
+        print(f"{'client':<12} {'call':<16} {'transient B/call':>17} {'retained B/call':>16}")
+        for name, options in CONFIGS:
+            pgm = PowerGoblinManager(host=address, **options)
+            for label, fn in (
+                ("create_trigger", lambda: pgm.create_trigger("Motion", "Motion detected")),
+                ("add_resource", lambda: pgm.add_custom_resource("alert_count", "1")),
+                ("trigger_payload", lambda: build_payload(pgm)),
+            ):
+                transient, retained = measure(fn, calls)
+                print(f"{name:<12} {label:<16} {transient:17.0f} {retained:16.1f}")
+            pgm.close()
+    finally:
+        server.terminate()
+        server.wait()
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
@@ -0,0 +1,79 @@
+"""
+Gateway benchmark with hundreds of simulated smart house units
+
+Every simulated unit is a PowerGoblinManager in gateway client mode with
+its own unit name. The units send their telemetry to a Gateway, which
+forwards it to a fake PowerGoblin server running in a child process. The
+same number of units then sends directly to the server, one HTTP request
+per record as the firmware does without a gateway, for comparison.
+
+    python -m host.bench_gateway [units] [records per unit] [server latency seconds]
+"""
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import host  # noqa: F401  (sets up sys.path)
+from host.fake_goblin import spawn
+from host.gateway import Gateway
+from power_goblin_manager import PowerGoblinManager
+
+SENDERS = 32  # Threads standing in for units sending at the same time
+
+def send_round(units, round_index):
+    """One record from every unit in units"""
+    for pgm in units:
+        pgm.add_custom_resource("bench", str(round_index))
+
+def run_units(units, records):
+    """Send records rounds from all units, spread over SENDERS threads"""
+    groups = [units[i::SENDERS] for i in range(SENDERS)]
+    with ThreadPoolExecutor(SENDERS) as pool:
+        for r in range(records):
+            list(pool.map(send_round, groups, [r] * len(groups)))
+
+def delivered(address, units, sample=10):
+    """Records the server holds for a sample of units"""
+    reader = PowerGoblinManager(address, keep_alive=True)
+    counts = [len(reader.get_resource_data("latest", pgm.unit, "bench") or [])
+              for pgm in units[:sample]]
+    reader.close()
+    return counts
+
+def main(count=300, records=20, latency=0.002):
+    server, address = spawn(latency=latency)
+    try:
+        total = count * records
+        with Gateway(address, bind="127.0.0.1", port=0, workers=8) as gateway:
+            units = [PowerGoblinManager(address, gateway=gateway.address, unit=f"house-{i:03d}")
+                     for i in range(count)]
+            start = time.perf_counter()
+            run_units(units, records)
+            sent = time.perf_counter() - start
+            while gateway.pending() and time.perf_counter() - start < 120:
+                time.sleep(0.01)
+            done = time.perf_counter() - start
+            stats = gateway.stats()
+            counts = delivered(address, units)
+            for pgm in units:
+                pgm.close()
+        print(f"{count} units x {records} records, server latency {latency * 1e3:.1f} ms")
+        print(f"gateway  sent in {sent:6.2f} s, forwarded in {done:6.2f} s "
+              f"({total / done:8.0f} records/s)  server connections {gateway.workers}")
+        print(f"         {stats}")
+        print(f"         records held by the server for {len(counts)} sampled units: {counts}")
+
+        units = [PowerGoblinManager(address, unit=f"direct-{i:03d}") for i in range(count)]
+        start = time.perf_counter()
+        run_units(units, records)
+        done = time.perf_counter() - start
+        print(f"direct   sent in {done:6.2f} s ({total / done:8.0f} records/s)  "
+              f"server connections {total}")
+    finally:
+        server.terminate()
+        server.wait()
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    main(int(args[0]) if args else 300, int(args[1]) if len(args) > 1 else 20,
+         float(args[2]) if len(args) > 2 else 0.002)
@@ -0,0 +1,59 @@
+"""
+Loop latency benchmark over the scripted scenarios
+
+Runs each scenario through the simulation harness and reports per-iteration
+loop latency percentiles, HTTP calls per minute and event-to-server latency.
+
+    python -m host.bench_loop [scenario ...] [--server-latency SECONDS] [--no-thread]
+
+--no-thread runs the PowerGoblin I/O on the control loop thread instead of
+the network worker.
+"""
+import contextlib
+import io
+import sys
+
+import host  # noqa: F401  (sets up sys.path)
+from host.harness import Harness
+from host.scenarios import SCENARIOS
+
+COLUMNS = (
+    ("iterations", "iter", "{:>6}"),
+    ("loop_p50_ms", "p50 ms", "{:>8.2f}"),
+    ("loop_p90_ms", "p90 ms", "{:>8.2f}"),
+    ("loop_p99_ms", "p99 ms", "{:>8.2f}"),
+    ("loop_max_ms", "max ms", "{:>8.2f}"),
+    ("http_per_min", "http/min", "{:>9.1f}"),
+    ("events_lost", "lost", "{:>5}"),
+    ("event_p50_ms", "ev p50 ms", "{:>10.1f}"),
+    ("event_max_ms", "ev max ms", "{:>10.1f}"),
+)
+
+def run_scenario(name, server_latency=0.0, monitor_options=None):
+    duration, steps = SCENARIOS[name]
+    # The firmware prints on every event, keep it out of the report
+    with contextlib.redirect_stdout(io.StringIO()):
+        with Harness(server_latency=server_latency, monitor_options=monitor_options) as harness:
+            harness.run(steps, duration)
+            return harness.report()
+
+def main(argv):
+    server_latency = 0.0
+    if "--server-latency" in argv:
+        i = argv.index("--server-latency")
+        server_latency = float(argv[i + 1])
+        argv = argv[:i] + argv[i + 2:]
+    monitor_options = None
+    if "--no-thread" in argv:
+        monitor_options = {"threaded": False}
+        argv = [arg for arg in argv if arg != "--no-thread"]
+    names = argv or list(SCENARIOS)
+
+    results = [(name, run_scenario(name, server_latency, monitor_options)) for name in names]
+    print(f"{'scenario':<10}" + "".join(f"{title:>{len(fmt.format(0)) + 1}}"
+                                        for _, title, fmt in COLUMNS))
+    for name, report in results:
+        print(f"{name:<10}" + "".join(" " + fmt.format(report[key]) for key, _, fmt in COLUMNS))
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
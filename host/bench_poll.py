@@ -0,0 +1,60 @@
+"""
+Compare re-reading a growing power log with cursor-based polling
+
+A local fake PowerGoblin server's power log grows by a fixed number of
+samples between polls, as it does during a live measurement. Each round
+the whole log is parsed once with stream_power_data, as a dashboard that
+re-fetches it would, and once with poll_power_data, which only parses the
+samples added since its previous poll. The polled samples are checked
+against the full log at the end.
+
+    python -m host.bench_poll [rounds] [samples per round]
+"""
+import sys
+import time
+from array import array
+
+import host  # noqa: F401  (sets up sys.path)
+from host.fake_goblin import FakeGoblinServer
+from power_goblin_manager import PowerGoblinManager
+
+def main(rounds=50, step=200):
+    with FakeGoblinServer() as server:
+        server.power_samples = 0
+        pgm = PowerGoblinManager(host=server.address, keep_alive=True, power_cache=1024)
+        full_time = poll_time = 0.0
+        full_last = poll_last = 0.0
+        polled = array("d")
+        for _ in range(rounds):
+            server.power_samples += step
+
+            start = time.perf_counter()
+            full = 0
+            for block in pgm.stream_power_data(1, 0, 0):
+                full += len(block) // 2
+            full_last = time.perf_counter() - start
+            full_time += full_last
+
+            start = time.perf_counter()
+            for block in pgm.poll_power_data(1, 0, 0):
+                polled.extend(block)
+            poll_last = time.perf_counter() - start
+            poll_time += poll_last
+
+        expected = array("d")
+        for block in pgm.stream_power_data(1, 0, 0):
+            expected.extend(block)
+        cache = pgm.cached_power_data(1, 0, 0)
+        pgm.close()
+
+    print(f"{rounds} polls, log grows to {server.power_samples} samples")
+    print(f"{'':<14}{'total s':>9}{'last poll ms':>14}")
+    print(f"{'full re-read':<14}{full_time:>9.3f}{full_last * 1e3:>14.2f}")
+    print(f"{'cursor poll':<14}{poll_time:>9.3f}{poll_last * 1e3:>14.2f}")
+    print(f"Speed-up {full_time / poll_time:.1f}x, polled samples "
+          f"{'match' if polled == expected else 'DIFFER from'} the full log, "
+          f"cache holds {len(cache)} (evicted {cache.evicted})")
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    main(int(args[0]) if args else 50, int(args[1]) if len(args) > 1 else 200)
@@ -0,0 +1,65 @@
+"""
+Startup benchmark: time from boot to the first control loop iteration
+
+Boots the firmware under the simulation harness against a slow fake
+PowerGoblin server, with eager session setup, lazy setup from scratch and
+lazy setup resuming a cached session. Reports the time to the first loop
+iteration, the time until the measurement start reaches the server and the
+number of setup requests sent before it.
+
+    python -m host.bench_startup [--server-latency SECONDS]
+"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+
+import host  # noqa: F401  (sets up sys.path)
+from host.fake_goblin import FakeGoblinServer
+from host.harness import Harness
+
+RUN_TIME = 3.0
+
+def boot(server, options):
+    """Boot once and run the idle loop briefly, returns (first iteration s, ready s, setup calls)"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        calls_before = len(server.calls)
+        transitions_before = len(server.transitions)
+        with Harness(server=server, monitor_options=options) as harness:
+            harness.run([], RUN_TIME)
+            report = harness.report()
+    calls = server.calls[calls_before:]
+    transitions = server.transitions[transitions_before:]
+    if transitions:
+        ready_s = transitions[0][0] - harness.started
+        setup_calls = sum(1 for c in calls if c[0] < transitions[0][0])
+    else:
+        ready_s = None
+        setup_calls = len(calls)
+    return report["startup_s"], ready_s, setup_calls
+
+def main(argv):
+    server_latency = 0.2
+    if "--server-latency" in argv:
+        server_latency = float(argv[argv.index("--server-latency") + 1])
+
+    metadata = os.path.join(tempfile.mkdtemp(), "goblin_session.json")
+    cases = (
+        ("eager", {"lazy": False, "metadata_path": None}),
+        ("lazy", {"lazy": True, "metadata_path": None}),
+        ("lazy cold", {"lazy": True, "metadata_path": metadata}),
+        ("lazy resume", {"lazy": True, "metadata_path": metadata}),
+    )
+    with FakeGoblinServer(latency=server_latency) as server:
+        results = [(name, boot(server, options)) for name, options in cases]
+    os.remove(metadata)
+
+    print(f"server latency {server_latency * 1e3:.0f} ms per request")
+    print(f"{'case':<12}{'first iter s':>13}{'ready s':>9}{'setup calls':>12}")
+    for name, (first, ready, calls) in results:
+        ready = f"{ready:>9.2f}" if ready is not None else f"{'-':>9}"
+        print(f"{name:<12}{first:>13.3f}{ready}{calls:>12}")
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,59 @@
+"""
+Compare the default urequests path with the keep-alive transport
+
+Runs the same sequence of PowerGoblinManager calls against a local fake
+PowerGoblin server, once opening a connection per request, once over a
+single persistent HTTP/1.1 socket and once more over that socket in
+fire-and-forget mode, and prints per-call latency.
+
+    python -m host.bench_transport [calls] [server latency seconds]
+"""
+import sys
+import time
+
+import host  # noqa: F401  (sets up sys.path)
+from host.fake_goblin import FakeGoblinServer
+from power_goblin_manager import PowerGoblinManager
+
+def run(pgm, calls):
+    """Issue a mix of telemetry calls, returns per-call latencies in seconds"""
+    latencies = []
+    for i in range(calls):
+        start = time.perf_counter()
+        if i % 2:
+            pgm.create_trigger("Bench", f"Trigger {i}")
+        else:
+            pgm.add_custom_resource("bench_value", str(i))
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+def report(name, latencies, server_calls):
+    latencies = sorted(latencies)
+    mean = sum(latencies) / len(latencies)
+    p50 = latencies[len(latencies) // 2]
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"{name:<12} mean {mean * 1e3:7.3f} ms  p50 {p50 * 1e3:7.3f} ms  "
+          f"p99 {p99 * 1e3:7.3f} ms  requests {server_calls}")
+    return mean
+
+def main(calls=500, latency=0.0):
+    with FakeGoblinServer(latency=latency) as server:
+        before = len(server.calls)
+        plain = PowerGoblinManager(host=server.address)
+        base = report("urequests", run(plain, calls), len(server.calls) - before)
+
+        before = len(server.calls)
+        pooled = PowerGoblinManager(host=server.address, keep_alive=True)
+        fast = report("keep-alive", run(pooled, calls), len(server.calls) - before)
+        print(f"TCP connections opened by keep-alive transport: {pooled.transport.connects}")
+        pooled.close()
+
+        before = len(server.calls)
+        forget = PowerGoblinManager(host=server.address, keep_alive=True, fire_and_forget=True)
+        fastest = report("forget", run(forget, calls), len(server.calls) - before)
+        forget.close()
+        print(f"Speed-up: keep-alive {base / fast:.2f}x, fire-and-forget {base / fastest:.2f}x")
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    main(int(args[0]) if args else 500, float(args[1]) if len(args) > 1 else 0.0)
@@ -0,0 +1,199 @@
+"""
+Parallel bulk export of PowerGoblin power and resource logs
+
+Fetches every requested (measurement, meter, channel) power log and
+(measurement, unit, resource) resource log with a bounded pool of worker
+threads. Each worker owns a PowerGoblinManager on a keep-alive connection,
+so the pool doubles as a connection pool. Every series is written as a
+columnar file of little-endian float64 [timestamp, value] rows, which loads
+directly with numpy.fromfile(path, "<f8").reshape(-1, 2) or numpy.memmap.
+
+manifest.json in the output directory records each series' file, sample
+count and last timestamp, and for power logs the PowerGoblinManager polling
+cursor. A re-export appends only samples newer than that timestamp, and
+skips a series entirely once it has been marked complete: it belongs to a
+measurement other than the last one requested (which may still be
+recording) and returned nothing new. Power logs are read with
+poll_power_data from the saved cursor, so the bytes of the samples already
+exported are skipped unparsed (the server only serves whole logs, they are
+still transferred); resource logs are small and parsed whole.
+
+Needs Python 3.7 or later, like the other host tools.
+
+    python -m host.bulk_export OUT_DIR --host HOST:PORT --measurements 1 2 3
+        [--meters 0] [--channels 0 1 2] [--resources ESP32:temperature_inside ...]
+        [--session latest] [--workers 8]
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
+
+import host  # noqa: F401  (sets up sys.path)
+from power_goblin_manager import PowerGoblinManager
+
+MANIFEST = "manifest.json"
+FORMAT = "float64 little-endian rows of [timestamp, value]"
+
+class BulkExporter:
+    """
+    Exports PowerGoblin logs into out_dir with at most workers requests in flight
+    """
+    def __init__(self, goblin_host, out_dir, session="latest", workers=8):
+        self.goblin_host = goblin_host
+        self.out_dir = out_dir
+        self.session = session
+        self.workers = workers
+        self.manifest = self._load_manifest()
+        self._local = threading.local()
+        self._clients = []
+        self._lock = threading.Lock()
+
+    def _load_manifest(self):
+        try:
+            with open(os.path.join(self.out_dir, MANIFEST)) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            manifest = {}
+        manifest.setdefault("format", FORMAT)
+        manifest.setdefault("series", {})
+        return manifest
+
+    def _save_manifest(self):
+        path = os.path.join(self.out_dir, MANIFEST)
+        with open(path + ".tmp", "w") as f:
+            json.dump(self.manifest, f, indent=1, sort_keys=True)
+        os.replace(path + ".tmp", path)
+
+    def _client(self):
+        """The calling worker's PowerGoblinManager, one keep-alive connection per thread"""
+        pgm = getattr(self._local, "pgm", None)
+        if pgm is None:
+            pgm = self._local.pgm = PowerGoblinManager(self.goblin_host, keep_alive=True)
+            pgm.session_id = self.session
+            with self._lock:
+                self._clients.append(pgm)
+        return pgm
+
+    def _fetch(self, key, kind, measurement, source, name, last_time, cursor):
+        """
+        Download the samples of one log newer than the exported ones, returns
+        (key, flat [timestamp, value, ...] array, polling cursor) or (key, None, None)
+        """
+        pgm = self._client()
+        if kind == "power":
+            if cursor is not None:
+                pgm.set_power_cursor(measurement, source, name, *cursor)
+            elif last_time is not None:
+                pgm.set_power_cursor(measurement, source, name, 0, last_time)
+            failures = pgm.poll_failures
+            values = array("d")
+            for block in pgm.poll_power_data(measurement, source, name):
+                values.extend(block)
+            if pgm.poll_failures != failures:
+                return key, None, None
+            return key, values, pgm.power_cursor(measurement, source, name)
+        rows = pgm.get_resource_data(measurement, source, name)
+        if rows is None or not isinstance(rows, list):
+            return key, None, None
+        # Logs are in time order, skip the rows exported last time
+        start = 0
+        if last_time is not None:
+            start = bisect_right([float(row[0]) for row in rows], last_time)
+        return key, array("d", map(float, chain.from_iterable(row[:2] for row in rows[start:]))), None
+
+    def _append(self, key, values, cursor, measurement, newest):
+        """Append new samples to the series file"""
+        entry = self.manifest["series"].get(key)
+        if entry is None:
+            entry = self.manifest["series"][key] = {
+                "file": key.replace("/", "_") + ".f64", "samples": 0, "last_time": None,
+                "complete": False}
+        if cursor is not None:
+            entry["cursor"] = list(cursor)
+        added = len(values) // 2
+        if added:
+            entry["samples"] += added
+            entry["last_time"] = values[-2]
+            if sys.byteorder == "big":
+                values.byteswap()
+            with open(os.path.join(self.out_dir, entry["file"]), "ab") as f:
+                values.tofile(f)
+        elif measurement != newest:
+            entry["complete"] = True  # Finished measurement, nothing left to fetch
+        return added
+
+    def export(self, measurements, meters=("0",), channels=("0", "1", "2"), resources=()):
+        """Export all requested series, returns a summary dict"""
+        os.makedirs(self.out_dir, exist_ok=True)
+        newest = measurements[-1]  # The only measurement that may still be recording
+        jobs = []
+        for measurement in measurements:
+            for meter in meters:
+                for channel in channels:
+                    jobs.append(("power", measurement, meter, channel))
+            for unit, resource in resources:
+                jobs.append(("resource", measurement, unit, resource))
+
+        started = time.perf_counter()
+        fetched = skipped = failed = samples = 0
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = []
+            for kind, measurement, source, name in jobs:
+                key = f"{kind}/{measurement}/{source}/{name}"
+                entry = self.manifest["series"].get(key) or {}
+                if entry.get("complete"):
+                    skipped += 1
+                    continue
+                futures.append((measurement, pool.submit(
+                    self._fetch, key, kind, measurement, source, name,
+                    entry.get("last_time"), entry.get("cursor"))))
+            # Results are written in submission order from this thread only
+            for measurement, future in futures:
+                key, values, cursor = future.result()
+                if values is None:
+                    failed += 1
+                    continue
+                fetched += 1
+                samples += self._append(key, values, cursor, str(measurement), str(newest))
+        self._save_manifest()
+        for pgm in self._clients:
+            pgm.close()
+        self._clients = []
+        return {
+            "series": len(jobs),
+            "fetched": fetched,
+            "skipped": skipped,
+            "failed": failed,
+            "new_samples": samples,
+            "seconds": time.perf_counter() - started,
+        }
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Bulk export PowerGoblin logs")
+    parser.add_argument("out_dir")
+    parser.add_argument("--host", required=True, help="PowerGoblin host:port")
+    parser.add_argument("--session", default="latest")
+    parser.add_argument("--measurements", nargs="+", required=True)
+    parser.add_argument("--meters", nargs="+", default=["0"])
+    parser.add_argument("--channels", nargs="+", default=["0", "1", "2"])
+    parser.add_argument("--resources", nargs="*", default=[], metavar="UNIT:RESOURCE")
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args(argv)
+
+    resources = [tuple(r.split(":", 1)) for r in args.resources]
+    exporter = BulkExporter(args.host, args.out_dir, args.session, args.workers)
+    summary = exporter.export(args.measurements, args.meters, args.channels, resources)
+    print(f"{summary['fetched']} of {summary['series']} series fetched "
+          f"({summary['skipped']} complete, {summary['failed']} failed), "
+          f"{summary['new_samples']} new samples in {summary['seconds']:.2f} s")
+    return 1 if summary["failed"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
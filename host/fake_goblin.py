@@ -0,0 +1,176 @@
+"""
+Local stand-in for the PowerGoblin server
+
+Implements the /api/v2/ endpoints used by PowerGoblinManager over a threaded
+HTTP/1.1 server, records every call it receives and keeps enough state
+(triggers, resources, run transitions) for scenarios to assert against.
+"""
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import host  # noqa: F401  (sets up sys.path)
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self._dispatch("GET", None)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        self._dispatch("POST", body)
+
+    def _dispatch(self, method, body):
+        goblin = self.server.goblin
+        if goblin.outage == "error":
+            # Simulated server failure: answer every request with a 500
+            goblin.refused += 1
+            self.send_response(500)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if goblin.outage:
+            # Simulated outage: drop the connection without answering
+            goblin.refused += 1
+            if goblin.outage == "hang":
+                time.sleep(goblin.hang_time)
+            self.close_connection = True
+            return
+        status, payload = goblin.handle(method, self.path, body)
+        data = json.dumps({"result": payload}).encode("utf-8") if status == 200 else b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+        self.wfile.flush()
+
+class FakeGoblinServer:
+    """
+    In-process PowerGoblin server for benchmarks and simulations
+    """
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0):
+        self.latency = latency  # Artificial server processing time per request, seconds
+        self.outage = None      # None, "refuse" (drop connections), "hang" (stall, then drop)
+                                # or "error" (answer 500)
+        self.hang_time = 5.0
+        self.refused = 0        # Requests dropped during outages
+        self.calls = []         # (time, method, path, body) for every request received
+        self.triggers = []
+        self.resources = []
+        self.transitions = []
+        self.renames = {}
+        self.session = 0
+        self.measurements = 0     # Measurements started, the latest one's id
+        self.power_samples = 100  # Length of the synthetic power logs
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.goblin = self
+        self._thread = None
+
+    @property
+    def address(self):
+        """host:port string suitable for PowerGoblinManager(host=...)"""
+        host, port = self._httpd.server_address[:2]
+        return f"{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def handle(self, method, path, body):
+        """Route one request, returns (status, result payload)"""
+        now = time.time()
+        with self._lock:
+            self.calls.append((now, method, path, body))
+        if self.latency:
+            time.sleep(self.latency)
+
+        if not path.startswith("/api/v2/"):
+            return 404, None
+        parts = path[len("/api/v2/"):].split("/")
+        text = body.decode("utf-8") if body else ""
+
+        if parts[:2] == ["cmd", "startSession"]:
+            with self._lock:
+                self.session += 1
+                self.renames = {}
+            return 200, f"session-{self.session}"
+        if parts[0] != "session" or len(parts) < 2:
+            return 404, None
+
+        rest = parts[2:]
+        if not rest:
+            return 200, {"id": f"session-{self.session}", "meters": ["0"]}
+        kind = rest[0]
+        with self._lock:
+            if kind == "meter":
+                if len(rest) == 1:
+                    return 200, ["0"]
+                if len(rest) >= 5 and rest[2] == "rename":
+                    self.renames[(rest[1], rest[3])] = rest[4]
+                return 200, "ok"
+            if kind in ("measurement", "run") and len(rest) >= 2:
+                self.transitions.append((now, kind, rest[1], text))
+                if kind == "measurement" and rest[1] == "start":
+                    self.measurements += 1
+                    return 200, self.measurements
+                return 200, "ok"
+            if kind == "trigger" and method == "POST":
+                self.triggers.append((now, json.loads(text)))
+                return 200, "ok"
+            if kind == "resource" and len(rest) >= 5:
+                self.resources.append((now, rest[1], rest[3], rest[4]))
+                return 200, "ok"
+            if kind == "logs" and len(rest) >= 2:
+                return 200, self.log_data(rest[1], rest[2:])
+        return 404, None
+
+    def log_data(self, kind, args):
+        """Synthetic log contents for logs/power and logs/resource requests"""
+        if kind == "resource" and len(args) >= 3:
+            return [[t, value] for t, name, value, unit in self.resources
+                    if name == args[2] and unit == args[1]]
+        return [[i * 0.1, 1.0 + (i % 10) * 0.05] for i in range(self.power_samples)]
+
+def spawn(port=0, power_samples=100, latency=0.0):
+    """Run a FakeGoblinServer in a child process, returns (process, "host:port")"""
+    import subprocess
+    args = [str(port), str(power_samples), str(latency)]
+    proc = subprocess.Popen([sys.executable, "-m", "host.fake_goblin"] + args,
+                            stdout=subprocess.PIPE, cwd=host.ROOT_DIR, text=True)
+    address = proc.stdout.readline().strip()
+    return proc, address
+
+if __name__ == "__main__":
+    # Arguments: [port [power samples [latency seconds]]]
+    server = FakeGoblinServer(port=int(sys.argv[1]) if len(sys.argv) > 1 else 0,
+                              latency=float(sys.argv[3]) if len(sys.argv) > 3 else 0.0)
+    if len(sys.argv) > 2:
+        server.power_samples = int(sys.argv[2])
+    server.start()
+    print(server.address, flush=True)
+    try:
+        server._thread.join()
+    except KeyboardInterrupt:
+        server.stop()
@@ -0,0 +1,220 @@
+"""
+Edge gateway between many smart house units and one PowerGoblin server
+
+Units run PowerGoblinManager in gateway client mode
+(PowerGoblinManager(gateway="host:9999", unit="house-17")) and send each
+trigger, resource and run/measurement transition as one compact UDP
+datagram (gateway_protocol). The gateway decodes them, tracks per-unit
+sequence numbers to count lost datagrams, and forwards the records to
+PowerGoblin from a few worker threads. Each worker owns a keep-alive,
+fire-and-forget PowerGoblinManager with an offline buffer, so the server
+sees a handful of persistent connections instead of one connection per
+event per unit, and records survive server outages.
+
+Records are sharded to workers by unit, which keeps every unit's records
+in order. Each worker drains its whole backlog per wake-up and sends it
+back to back over its connection. PowerGoblin has no multi-record
+endpoint, so a batch is still one request per record.
+
+    python -m host.gateway --goblin HOST:PORT [--port 9999] [--workers 4]
+        [--start-session]
+"""
+import argparse
+import socket
+import sys
+import threading
+import time
+from collections import deque
+
+import host  # noqa: F401  (sets up sys.path)
+import gateway_protocol
+from power_goblin_manager import PowerGoblinManager, TRIGGER, RESOURCE
+
+def record_unit(kind, fields):
+    """Unit name carried in a record's fields"""
+    if kind == TRIGGER or kind == RESOURCE:
+        return fields[2] if len(fields) > 2 else ""
+    return fields[0] if fields else ""
+
+class Gateway:
+    """
+    UDP collector and PowerGoblin forwarder, see the module docstring
+    """
+    def __init__(self, goblin_host, bind="0.0.0.0", port=9999, workers=4,
+                 max_pending=4096, offline_buffer=1024, **pgm_options):
+        self.goblin_host = goblin_host
+        self.bind = bind
+        self.port = port
+        self.workers = workers
+        self.max_pending = max_pending  # Per worker, the oldest record is dropped beyond it
+        self.offline_buffer = offline_buffer
+        self.pgm_options = pgm_options
+        self.running = False
+        self.sock = None
+        self.queues = [deque() for _ in range(workers)]
+        self.conditions = [threading.Condition() for _ in range(workers)]
+        self.clients = []
+        self._threads = []
+
+        # Counters
+        self.received = 0
+        self.forwarded = 0
+        self.dropped = 0        # Records discarded because a worker queue was full
+        self.bad = 0            # Datagrams that could not be decoded
+        self.errors = 0         # Records that raised while being forwarded
+        self.lost = 0           # Datagrams missing from a unit's sequence numbers
+        self.units = {}         # Unit -> [records received, last sequence number]
+        self._in_flight = 0     # Records taken by workers and not yet sent
+        self._lock = threading.Lock()
+
+    @property
+    def address(self):
+        """host:port string suitable for PowerGoblinManager(gateway=...)"""
+        host, port = self.sock.getsockname()[:2]
+        return f"{'127.0.0.1' if host == '0.0.0.0' else host}:{port}"
+
+    def start(self):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+        self.sock.bind((self.bind, self.port))
+        self.sock.settimeout(0.2)
+        self.running = True
+        for i in range(self.workers):
+            pgm = PowerGoblinManager(self.goblin_host, keep_alive=True, fire_and_forget=True,
+                                     offline_buffer=self.offline_buffer, **self.pgm_options)
+            self.clients.append(pgm)
+            self._threads.append(threading.Thread(target=self._forward, args=(i,), daemon=True))
+        self._threads.append(threading.Thread(target=self._receive, daemon=True))
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self, timeout=5):
+        """Forward what is queued for up to timeout seconds, then stop"""
+        deadline = time.time() + timeout
+        while self.pending() and time.time() < deadline:
+            time.sleep(0.01)
+        self.running = False
+        for condition in self.conditions:
+            with condition:
+                condition.notify()
+        for thread in self._threads:
+            thread.join(max(0.1, deadline - time.time()))
+        self.sock.close()
+        for pgm in self.clients:
+            pgm.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def pending(self):
+        """Records received but not yet handed to PowerGoblin"""
+        return sum(len(q) for q in self.queues) + self._in_flight
+
+    def _receive(self):
+        buf = bytearray(gateway_protocol.MAX_DATAGRAM)
+        view = memoryview(buf)
+        while self.running:
+            try:
+                n, _ = self.sock.recvfrom_into(buf)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            try:
+                kind, seq, timestamp, fields = gateway_protocol.decode(view[:n])
+            except (ValueError, UnicodeError):
+                self.bad += 1
+                continue
+            self.received += 1
+            unit = record_unit(kind, fields)
+            self._track(unit, seq)
+
+            shard = hash(unit) % self.workers
+            condition = self.conditions[shard]
+            with condition:
+                queue = self.queues[shard]
+                if len(queue) >= self.max_pending:
+                    queue.popleft()
+                    self.dropped += 1
+                queue.append((kind, fields, timestamp))
+                condition.notify()
+
+    def _track(self, unit, seq):
+        """Count records per unit and datagrams missing from its sequence"""
+        state = self.units.get(unit)
+        if state is None:
+            self.units[unit] = [1, seq]
+            return
+        gap = (seq - state[1] - 1) & 0xFFFF
+        if gap < 0x8000:  # A larger jump means the unit restarted its counter
+            self.lost += gap
+        state[0] += 1
+        state[1] = seq
+
+    def _forward(self, index):
+        pgm = self.clients[index]
+        queue = self.queues[index]
+        condition = self.conditions[index]
+        while self.running or queue:
+            with condition:
+                if not queue:
+                    condition.wait(0.5)
+                batch = list(queue)
+                with self._lock:
+                    self._in_flight += len(batch)
+                queue.clear()
+            for kind, fields, timestamp in batch:
+                try:
+                    pgm.submit(kind, fields, timestamp)
+                except Exception as e:
+                    # One bad record must not stop this shard's forwarding
+                    self.errors += 1
+                    print(f"Gateway forward error: {e}")
+            with self._lock:
+                self._in_flight -= len(batch)
+                self.forwarded += len(batch)
+            if not batch and pgm.offline is not None and len(pgm.offline):
+                pgm.replay()  # Idle, retry records buffered during an outage
+
+    def stats(self):
+        """Gateway counters for monitoring"""
+        return {
+            "units": len(self.units),
+            "received": self.received,
+            "forwarded": self.forwarded,
+            "pending": self.pending(),
+            "buffered": sum(len(pgm.offline) for pgm in self.clients if pgm.offline is not None),
+            "dropped": self.dropped,
+            "lost": self.lost,
+            "bad": self.bad,
+            "errors": self.errors,
+        }
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="PowerGoblin edge gateway")
+    parser.add_argument("--goblin", required=True, help="PowerGoblin host:port")
+    parser.add_argument("--bind", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=9999)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--start-session", action="store_true",
+                        help="Start a new PowerGoblin session before forwarding")
+    parser.add_argument("--stats-interval", type=float, default=60)
+    args = parser.parse_args(argv)
+
+    if args.start_session:
+        PowerGoblinManager(args.goblin).start_session()
+    gateway = Gateway(args.goblin, args.bind, args.port, args.workers).start()
+    print(f"Gateway listening on {args.bind}:{args.port}, forwarding to {args.goblin}")
+    try:
+        while True:
+            time.sleep(args.stats_interval)
+            print(gateway.stats())
+    except KeyboardInterrupt:
+        gateway.stop()
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
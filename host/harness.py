@@ -0,0 +1,212 @@
+"""
+Run the smart house firmware on CPython against simulated hardware
+
+The Harness starts a fake PowerGoblin server, points the firmware's
+SmartHousePowerMonitor at it, imports main_with_power_monitoring with the
+host/sim stand-ins for machine, dht, display_manager, website_manager and
+combine_btn_motion, and runs the unmodified main() in a thread while a
+scenario script presses buttons, raises motion alerts and takes the server
+down. A time proxy injected into the main module measures every loop
+iteration and stops the loop at the end of the scenario.
+"""
+import importlib
+import sys
+import threading
+import time
+
+import host  # noqa: F401  (sets up sys.path)
+from host.fake_goblin import FakeGoblinServer
+import combine_btn_motion
+import display_manager
+import machine
+import smarthouse_power_monitor
+import website_manager
+
+BUTTON_PIN = 26
+LOOP_SLEEP = 0.1  # The end-of-iteration sleep in main_with_power_monitoring.main
+
+def percentile(values, p):
+    """p-th percentile (0-100) of values by nearest rank"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+class LoopClock:
+    """
+    Stand-in for the time module inside the firmware main module
+    The end-of-iteration sleep marks iteration boundaries, so the time from
+    waking up to the next such sleep is the work done by one iteration.
+    Setting stop makes the next sleep raise KeyboardInterrupt, which runs
+    the firmware's normal shutdown path.
+    """
+    def __init__(self, loop_sleep=LOOP_SLEEP):
+        self.loop_sleep = loop_sleep
+        self.latencies = []       # Seconds of work per loop iteration
+        self.first_iteration = None
+        self.stop = False
+        self._wake = None
+
+    def __getattr__(self, name):
+        return getattr(time, name)
+
+    def time(self):
+        return time.time()
+
+    def sleep(self, seconds):
+        if self.stop:
+            raise KeyboardInterrupt
+        boundary = seconds == self.loop_sleep
+        if boundary:
+            now = time.perf_counter()
+            if self._wake is not None:
+                self.latencies.append(now - self._wake)
+            elif self.first_iteration is None:
+                self.first_iteration = time.time()
+        time.sleep(seconds)
+        if boundary:
+            self._wake = time.perf_counter()
+
+class Harness:
+    """
+    One simulated smart house unit talking to a fake PowerGoblin server
+    """
+    def __init__(self, server_latency=0.0, module="main_with_power_monitoring",
+                 monitor_options=None, server=None):
+        # A server passed in is shared with other harnesses and left running
+        self.own_server = server is None
+        self.server = server if server is not None else FakeGoblinServer(latency=server_latency)
+        # Overrides of the firmware's monitor options, no session cache on the host by default
+        self.monitor_options = {"metadata_path": None}
+        self.monitor_options.update(monitor_options or {})
+        self.module_name = module
+        self.module = None
+        self.clock = LoopClock()
+        self.events = []   # (time, expected trigger type) for every scripted input
+        self.started = None
+        self.loop_started = None
+        self.finished = None
+        self._thread = None
+        self._error = None
+
+    def __enter__(self):
+        if self.own_server:
+            self.server.start()
+        for sim in (machine, display_manager, website_manager, combine_btn_motion):
+            sim.reset()
+
+        # Point the firmware at the fake server instead of its hard-coded address
+        real_monitor = smarthouse_power_monitor.SmartHousePowerMonitor
+        address = self.server.address
+        overrides = self.monitor_options
+
+        class RedirectedMonitor(real_monitor):
+            def __init__(self, goblin_host=None, **options):
+                options.update(overrides)
+                super().__init__(goblin_host=address, **options)
+
+        smarthouse_power_monitor.SmartHousePowerMonitor = RedirectedMonitor
+        self.started = time.time()
+        try:
+            if self.module_name in sys.modules:
+                self.module = importlib.reload(sys.modules[self.module_name])
+            else:
+                self.module = importlib.import_module(self.module_name)
+        finally:
+            smarthouse_power_monitor.SmartHousePowerMonitor = real_monitor
+        self.module.time = self.clock
+        return self
+
+    def __exit__(self, *exc):
+        if self.own_server:
+            self.server.stop()
+
+    def _run_main(self):
+        try:
+            self.module.main()
+        except BaseException as e:
+            self._error = e
+
+    def run(self, steps, duration):
+        """Run main() for duration seconds while applying the scenario steps"""
+        self._thread = threading.Thread(target=self._run_main, daemon=True)
+        self.loop_started = time.time()
+        self._thread.start()
+        for step in steps:
+            at, action, args = step[0], step[1], step[2:]
+            delay = self.loop_started + at - time.time()
+            if delay > 0:
+                time.sleep(delay)
+            getattr(self, "do_" + action)(*args)
+        delay = self.loop_started + duration - time.time()
+        if delay > 0:
+            time.sleep(delay)
+        self.clock.stop = True
+        self._thread.join(30)
+        self.finished = time.time()
+        if self._error is not None:
+            raise self._error
+
+    # Scenario actions
+    def do_press(self, hold=0.15):
+        """Press and release the door button"""
+        pin = machine.pins[BUTTON_PIN]
+        self.events.append((time.time(), "DoorState"))
+        pin.set_level(0)
+        threading.Timer(hold, pin.set_level, (1,)).start()
+
+    def do_motion(self, length=2):
+        """Report a motion alert lasting length seconds"""
+        self.events.append((time.time(), "Motion"))
+        combine_btn_motion.trigger_alert(length)
+
+    def do_outage(self, mode="refuse"):
+        """Make the PowerGoblin server unreachable"""
+        self.server.outage = mode
+
+    def do_restore(self):
+        """Bring the PowerGoblin server back"""
+        self.server.outage = None
+
+    def do_temperature(self, level):
+        """Change the temperature seen by the DHT11"""
+        self.module.dht_sensor.level = level
+
+    # Results
+    def event_latencies(self):
+        """Seconds from each scripted input to the server receiving its trigger, None if lost"""
+        received = list(self.server.triggers)
+        used = set()
+        latencies = []
+        for at, trigger_type in self.events:
+            latency = None
+            for i, (recv_time, payload) in enumerate(received):
+                if i not in used and recv_time >= at and payload.get("triggerType") == trigger_type:
+                    used.add(i)
+                    latency = recv_time - at
+                    break
+            latencies.append(latency)
+        return latencies
+
+    def report(self):
+        """Loop latency percentiles, HTTP traffic and event-to-server latency"""
+        loop = self.clock.latencies
+        duration = self.finished - self.loop_started
+        loop_calls = [c for c in self.server.calls if c[0] >= self.loop_started]
+        events = self.event_latencies()
+        delivered = [e for e in events if e is not None]
+        return {
+            "iterations": len(loop),
+            "loop_p50_ms": percentile(loop, 50) * 1e3,
+            "loop_p90_ms": percentile(loop, 90) * 1e3,
+            "loop_p99_ms": percentile(loop, 99) * 1e3,
+            "loop_max_ms": max(loop) * 1e3 if loop else 0.0,
+            "startup_s": (self.clock.first_iteration or self.finished) - self.started,
+            "http_per_min": len(loop_calls) / duration * 60,
+            "refused": self.server.refused,
+            "events": len(events),
+            "events_lost": len(events) - len(delivered),
+            "event_p50_ms": percentile(delivered, 50) * 1e3,
+            "event_max_ms": max(delivered) * 1e3 if delivered else 0.0,
+        }
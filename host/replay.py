@@ -0,0 +1,256 @@
+"""
+Replay a recorded event trace through the firmware faster than real time
+
+A trace recorded on the device (event_trace.TraceRecorder, enabled with
+TRACE_EVENTS in main_with_power_monitoring) holds every button press,
+motion alert and temperature change with its time. The replay engine runs
+the unmodified main() under the simulation harness on a virtual clock: the
+loop's sleeps return at once and advance virtual time, the tick functions
+of the firmware modules follow that clock, and the recorded inputs are
+injected when virtual time reaches them. Wall-clock time per iteration is
+measured, so throughput and loop latency regressions show up on real
+workloads, and the outputs (door, fan, alert and telemetry events) are
+compared with the recorded ones.
+
+Each recorder run in the trace (it restarts at every boot) is replayed on
+its own, as one run of main().
+
+    python -m host.replay TRACE                      replay trace (and TRACE.1 if present)
+    python -m host.replay --record SCENARIO TRACE    record a harness scenario to TRACE
+"""
+import contextlib
+import io
+import os
+import sys
+import time
+
+import host  # noqa: F401  (sets up sys.path)
+from host.harness import Harness, BUTTON_PIN, LOOP_SLEEP, percentile
+from host.scenarios import SCENARIOS
+import clock
+import combine_btn_motion
+import dht
+import event_trace
+from event_trace import BUTTON, MOTION, TEMPERATURE, TELEMETRY, START, INPUTS, EVENT_NAMES
+import machine
+
+PRESS_MS = 150  # How long a replayed button press holds the pin low
+
+# Firmware modules whose tick functions or time module follow the virtual clock
+TICK_MODULES = ("button", "sensor_service", "alert_signal", "rate_limit", "deadband",
+                "profiler", "circuit_breaker", "event_trace", "heap_monitor")
+TIME_MODULES = ("power_goblin_manager", "event_queue", "smarthouse_power_monitor")
+
+def load_trace(path):
+    """Records of a trace file and its rotated predecessor, oldest first"""
+    data = b""
+    for part in (path + ".1", path):
+        if os.path.exists(part):
+            with open(part, "rb") as f:
+                data += f.read()
+    return event_trace.read_records(data)
+
+class VirtualClock:
+    """
+    Stand-in for the time module and tick functions on virtual time
+    sleep() returns at once after advancing the clock and calling on_sleep.
+    """
+    def __init__(self, on_sleep, start_ms):
+        self.on_sleep = on_sleep
+        self.ms = float(start_ms)
+        self._epoch = time.time() - start_ms / 1000
+
+    def __getattr__(self, name):
+        return getattr(time, name)
+
+    def time(self):
+        return self._epoch + self.ms / 1000
+
+    def sleep(self, seconds):
+        self.ms += seconds * 1000
+        self.on_sleep(seconds)
+
+    def sleep_ms(self, ms):
+        self.sleep(ms / 1000)
+
+    def ticks_ms(self):
+        return int(self.ms)
+
+    def ticks_us(self):
+        return int(self.ms * 1000)
+
+    @staticmethod
+    def ticks_diff(a, b):
+        return a - b
+
+    @staticmethod
+    def ticks_add(a, delta):
+        return a + delta
+
+class MemoryTrace:
+    """Trace recorder keeping (ms, event, detail, value) records in a list"""
+    def __init__(self, clock):
+        self.clock = clock
+        self.start = clock.ms
+        self.records = []
+
+    def record(self, event, detail=0, value=0.0):
+        self.records.append((int(self.clock.ms - self.start), event, detail, value))
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+class Replayer:
+    """
+    Replays trace records through main() on a virtual clock, see the module docstring
+    """
+    def __init__(self, records, tail=2.0):
+        # Times count from the start of the recorder run
+        first = records[0][0] if records else 0
+        records = [(ms - first, event, detail, value) for ms, event, detail, value in records]
+        self.records = records
+        self.inputs = [r for r in records if r[1] in INPUTS]
+        self.tail_ms = tail * 1000
+        self.end_ms = (records[-1][0] if records else 0) + self.tail_ms
+        self.latencies = []
+        self.trace = None
+        self._next = 0
+        self._releases = []
+        self._wake = None
+
+    def _on_sleep(self, seconds):
+        if seconds == LOOP_SLEEP:
+            now = time.perf_counter()
+            if self._wake is not None:
+                self.latencies.append(now - self._wake)
+        elapsed = self.clock.ms - self.trace.start
+        pin = machine.pins[BUTTON_PIN]
+        while self._releases and self._releases[0] <= elapsed:
+            self._releases.pop(0)
+            pin.set_level(1)
+        while self._next < len(self.inputs) and self.inputs[self._next][0] <= elapsed:
+            _, event, detail, value = self.inputs[self._next]
+            self._next += 1
+            if event == BUTTON:
+                pin.set_level(0)
+                self._releases.append(elapsed + PRESS_MS)
+            elif event == MOTION:
+                combine_btn_motion.trigger_alert(value)
+            elif event == TEMPERATURE and detail == 0:
+                self.module.dht_sensor.level = value
+        if elapsed >= self.end_ms:
+            raise KeyboardInterrupt
+        if seconds == LOOP_SLEEP:
+            self._wake = time.perf_counter()
+
+    def run(self):
+        """Replay the whole trace, returns a report dict"""
+        options = {"threaded": False, "lazy": False}
+        measure_time = dht.DHT11.measure_time
+        dht.DHT11.measure_time = 0  # Sensor reads cost no wall time in replay
+        patched = []
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                with Harness(monitor_options=options) as harness:
+                    self.module = harness.module
+                    self.clock = VirtualClock(self._on_sleep, clock.ticks_ms())
+                    for name in TICK_MODULES:
+                        module = sys.modules.get(name)
+                        for attr in ("ticks_ms", "ticks_us", "ticks_diff", "ticks_add"):
+                            if module is not None and hasattr(module, attr):
+                                patched.append((module, attr, getattr(module, attr)))
+                                setattr(module, attr, getattr(self.clock, attr))
+                    for name in TIME_MODULES:
+                        module = sys.modules[name]
+                        patched.append((module, "time", module.time))
+                        module.time = self.clock
+                    self.module.time = self.clock
+                    self.trace = MemoryTrace(self.clock)
+                    self.module.trace = self.trace
+                    self.module.power_monitor.trace = self.trace
+
+                    started = time.perf_counter()
+                    self.module.main()
+                    wall = time.perf_counter() - started
+        finally:
+            for module, attr, value in patched:
+                setattr(module, attr, value)
+            dht.DHT11.measure_time = measure_time
+        virtual = (self.clock.ms - self.trace.start) / 1000
+        return self.report(wall, virtual)
+
+    def report(self, wall, virtual):
+        recorded = summarize(self.records)
+        replayed = summarize(self.trace.records)
+        loop = self.latencies
+        return {
+            "virtual_s": virtual,
+            "wall_s": wall,
+            "speedup": virtual / wall if wall else 0.0,
+            "iterations": len(loop),
+            "loop_p50_ms": percentile(loop, 50) * 1e3,
+            "loop_p99_ms": percentile(loop, 99) * 1e3,
+            "loop_max_ms": max(loop) * 1e3 if loop else 0.0,
+            "recorded": recorded,
+            "replayed": replayed,
+            "outputs_match": actuations(self.records) == actuations(self.trace.records),
+        }
+
+def summarize(records):
+    """Number of records per event name (telemetry split by call)"""
+    calls = {code: name for name, code in event_trace.TELEMETRY_CALLS.items()}
+    counts = {}
+    for _, event, detail, _ in records:
+        if event == START:
+            continue
+        name = EVENT_NAMES.get(event, str(event))
+        if event == TELEMETRY:
+            name += ":" + calls.get(detail, str(detail))
+        counts[name] = counts.get(name, 0) + 1
+    return counts
+
+def actuations(records):
+    """Ordered door, fan and alert outputs, which must not change between runs"""
+    return [(event, detail) for _, event, detail, _ in records
+            if event in (event_trace.DOOR, event_trace.FAN, event_trace.ALERT_END)]
+
+def record_scenario(name, path):
+    """Run a harness scenario in real time with the trace recorder on"""
+    for part in (path, path + ".1"):
+        if os.path.exists(part):
+            os.remove(part)
+    duration, steps = SCENARIOS[name]
+    with contextlib.redirect_stdout(io.StringIO()):
+        with Harness() as harness:
+            recorder = event_trace.TraceRecorder(path)
+            harness.module.trace = recorder
+            harness.module.power_monitor.trace = recorder
+            harness.run(steps, duration)
+    return recorder.records
+
+def main(argv):
+    if argv[:1] == ["--record"]:
+        count = record_scenario(argv[1], argv[2])
+        print(f"Recorded {count} events of scenario {argv[1]} to {argv[2]}")
+        return
+    runs = event_trace.sessions(load_trace(argv[0]))
+    for index, records in enumerate(runs):
+        if len(runs) > 1:
+            print(f"recorder run {index + 1} of {len(runs)}")
+        print_report(Replayer(records).run())
+
+def print_report(report):
+    print(f"replayed {report['virtual_s']:.1f} s of trace in {report['wall_s']:.2f} s "
+          f"({report['speedup']:.0f}x real time), {report['iterations']} iterations")
+    print(f"loop p50 {report['loop_p50_ms']:.3f} ms  p99 {report['loop_p99_ms']:.3f} ms  "
+          f"max {report['loop_max_ms']:.3f} ms")
+    print(f"{'event':<34}{'recorded':>9}{'replayed':>9}")
+    for name in sorted(set(report["recorded"]) | set(report["replayed"])):
+        print(f"{name:<34}{report['recorded'].get(name, 0):>9}{report['replayed'].get(name, 0):>9}")
+    print("door/fan/alert outputs " + ("match" if report["outputs_match"] else "DIFFER"))
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
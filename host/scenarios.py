@@ -0,0 +1,41 @@
+"""
+Scripted workloads for the simulation harness
+
+Each scenario is (duration seconds, steps) where a step is
+(seconds after the loop starts, action, *arguments) and action names a
+Harness.do_<action> method.
+"""
+SCENARIOS = {
+    "idle": (8, []),
+    "buttons": (10, [
+        (1.0, "press"),
+        (2.5, "press"),
+        (4.0, "press", 1.5),   # Button held for 1.5 s
+        (7.0, "press"),
+    ]),
+    "motion": (14, [
+        (1.0, "motion", 2),
+        (5.0, "motion", 6),    # Long enough to start an emergency run
+        (6.0, "press"),        # Button pressed during the emergency
+    ]),
+    "outage": (16, [
+        (1.0, "press"),
+        (2.0, "outage"),
+        (3.0, "press"),
+        (4.0, "motion", 1),
+        (7.0, "restore"),
+        (8.0, "press"),
+    ]),
+    "hang": (20, [
+        (1.0, "press"),
+        (2.0, "outage", "hang"),  # Server accepts connections but never answers
+        (3.0, "press"),
+        (4.0, "motion", 1),
+        (9.0, "restore"),
+        (10.0, "press"),
+    ]),
+    "temperature": (20, [
+        (6.0, "temperature", 28),   # Room heats up
+        (14.0, "temperature", 22),
+    ]),
+}
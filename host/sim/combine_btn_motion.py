@@ -0,0 +1,36 @@
+"""
+Host stand-in for the combine_btn_motion module
+
+Scenarios queue motion alerts with trigger_alert(length); the next call to
+detect_alert_state reports it. Brake light and buzzer activity is recorded.
+"""
+import threading
+
+_lock = threading.Lock()
+pending = []   # Alert lengths waiting to be detected
+signals = []   # ("brake" | "clear" | "buzzer_off") history
+
+def reset():
+    with _lock:
+        pending.clear()
+    signals.clear()
+
+def trigger_alert(length):
+    """Make the next detect_alert_state call report an alert of length seconds"""
+    with _lock:
+        pending.append(length)
+
+def detect_alert_state():
+    with _lock:
+        if pending:
+            return True, pending.pop(0)
+    return False, 0
+
+def activate_brake_and_warning():
+    signals.append("brake")
+
+def clear_brake_light():
+    signals.append("clear")
+
+def stop_buzzer():
+    signals.append("buzzer_off")
@@ -0,0 +1,33 @@
+"""
+Host stand-in for MicroPython's dht module
+
+measure() blocks for measure_time seconds like the real single-wire read
+and can be made to fail, so sensor caching and error paths can be tested.
+"""
+import time
+
+class DHT11:
+    measure_time = 0.02  # A DHT11 read takes tens of milliseconds on the ESP32
+
+    def __init__(self, pin):
+        self.pin = pin
+        self.level = 21       # Temperature the simulated room is at
+        self.fail = False     # Make measure() raise like a timed-out read
+        self.measurements = 0
+        self._temperature = None
+
+    def measure(self):
+        self.measurements += 1
+        time.sleep(self.measure_time)
+        if self.fail:
+            raise OSError("ETIMEDOUT")
+        self._temperature = self.level
+
+    def temperature(self):
+        return self._temperature
+
+    def humidity(self):
+        return 40
+
+class DHT22(DHT11):
+    pass
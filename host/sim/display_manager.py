@@ -0,0 +1,14 @@
+"""Host stand-in for the display_manager module, records what would be shown"""
+messages = []
+
+def reset():
+    messages.clear()
+
+def write_message(message):
+    messages.append(("write", message))
+
+def force_message(message):
+    messages.append(("force", message))
+
+def rolling_message():
+    messages.append(("rolling", None))
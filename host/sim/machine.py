@@ -0,0 +1,97 @@
+"""
+Host stand-in for MicroPython's machine module
+
+Pins and PWM channels are simulated in memory. Every Pin is registered by
+id so scenarios can drive inputs (set_level fires IRQ handlers the way the
+hardware would) and inspect outputs such as servo and fan duty cycles.
+"""
+import threading
+
+pins = {}
+pwms = {}
+_irq_lock = threading.RLock()
+
+def reset():
+    """Forget all simulated pins and PWM channels"""
+    pins.clear()
+    pwms.clear()
+
+def disable_irq():
+    _irq_lock.acquire()
+    return 1
+
+def enable_irq(state):
+    _irq_lock.release()
+
+def reset_cause():
+    return 0
+
+def freq(value=None):
+    return 240000000
+
+class Pin:
+    IN = 1
+    OUT = 3
+    PULL_UP = 2
+    PULL_DOWN = 1
+    IRQ_FALLING = 2
+    IRQ_RISING = 1
+
+    def __init__(self, id, mode=-1, pull=-1, value=None):
+        self.id = id
+        self.mode = mode
+        self.pull = pull
+        self._level = 1 if pull == Pin.PULL_UP else 0
+        if value is not None:
+            self._level = value
+        self._handler = None
+        self._trigger = 0
+        pins[id] = self
+
+    def value(self, level=None):
+        if level is None:
+            return self._level
+        self._level = 1 if level else 0
+
+    def on(self):
+        self._level = 1
+
+    def off(self):
+        self._level = 0
+
+    def irq(self, handler=None, trigger=IRQ_FALLING | IRQ_RISING):
+        self._handler = handler
+        self._trigger = trigger
+
+    def set_level(self, level):
+        """Drive an input pin from a scenario, firing the IRQ handler on an edge"""
+        level = 1 if level else 0
+        if level == self._level:
+            return
+        self._level = level
+        edge = Pin.IRQ_RISING if level else Pin.IRQ_FALLING
+        if self._handler is not None and self._trigger & edge:
+            with _irq_lock:
+                self._handler(self)
+
+class PWM:
+    def __init__(self, pin, freq=0, duty=0):
+        self.pin = pin
+        self._freq = freq
+        self._duty = duty
+        self.history = []  # Every duty cycle written, for scenario assertions
+        pwms[pin.id] = self
+
+    def freq(self, value=None):
+        if value is None:
+            return self._freq
+        self._freq = value
+
+    def duty(self, value=None):
+        if value is None:
+            return self._duty
+        self._duty = value
+        self.history.append(value)
+
+    def deinit(self):
+        pass
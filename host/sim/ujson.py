@@ -0,0 +1,2 @@
+"""Host stand-in for MicroPython's ujson module"""
+from json import dumps, dump, loads, load
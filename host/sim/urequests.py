@@ -0,0 +1,85 @@
+"""
+Host stand-in for MicroPython's urequests module
+
+Mirrors the behaviour of the device library: every call opens a fresh TCP
+connection, sends an HTTP/1.0 request and reads the body until the server
+closes the socket. This keeps host benchmarks of the default request path
+representative of what the ESP32 does.
+"""
+import json
+import socket
+
+class Response:
+    def __init__(self, sock):
+        self.raw = sock.makefile("rb")
+        self._sock = sock
+        self.status_code = None
+        self.reason = ""
+        self.headers = {}
+        self._content = None
+
+    def close(self):
+        if self.raw is not None:
+            self.raw.close()
+            self._sock.close()
+        self.raw = None
+
+    @property
+    def content(self):
+        if self._content is None:
+            try:
+                self._content = self.raw.read()
+            finally:
+                self.close()
+        return self._content
+
+    @property
+    def text(self):
+        return str(self.content, "utf-8")
+
+    def json(self):
+        return json.loads(self.content)
+
+def request(method, url, data=None, json=None, headers=None, timeout=None):
+    proto, _, host, path = url.split("/", 3)
+    port = 443 if proto == "https:" else 80
+    if ":" in host:
+        host, port = host.split(":", 1)
+        port = int(port)
+
+    sock = socket.create_connection((host, port), timeout)
+    try:
+        if json is not None:
+            import json as _json
+            data = _json.dumps(json)
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        head = f"{method} /{path} HTTP/1.0\r\nHost: {host}\r\n"
+        for name, value in (headers or {}).items():
+            head += f"{name}: {value}\r\n"
+        if data is not None:
+            head += f"Content-Length: {len(data)}\r\n"
+        head += "\r\n"
+        sock.sendall(head.encode("utf-8") + (data or b""))
+
+        resp = Response(sock)
+        line = resp.raw.readline().split(None, 2)
+        resp.status_code = int(line[1])
+        if len(line) > 2:
+            resp.reason = line[2].rstrip().decode()
+        while True:
+            line = resp.raw.readline()
+            if not line or line == b"\r\n":
+                break
+            name, _, value = line.decode().partition(":")
+            resp.headers[name.strip()] = value.strip()
+        return resp
+    except:
+        sock.close()
+        raise
+
+def get(url, **kw):
+    return request("GET", url, **kw)
+
+def post(url, **kw):
+    return request("POST", url, **kw)
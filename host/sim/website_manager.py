@@ -0,0 +1,8 @@
+"""Host stand-in for the website_manager module, records alerts sent to the website"""
+alerts = []
+
+def reset():
+    alerts.clear()
+
+def alert_website(message):
+    alerts.append(message)
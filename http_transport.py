@@ -0,0 +1,267 @@
+try:
+    import usocket as socket
+except ImportError:
+    import socket
+try:
+    import uerrno as errno
+except ImportError:
+    import errno
+import ujson as json
+
+def _is_timeout(e):
+    """True for a socket timeout, on MicroPython an OSError carrying ETIMEDOUT"""
+    return isinstance(e, getattr(socket, "timeout", ())) or (e.args and e.args[0] == errno.ETIMEDOUT)
+
+class BodyReader:
+    """
+    File-like view of a response body that stops at its Content-Length
+    Lets callers stream a large body in chunks over the persistent socket
+    """
+    def __init__(self, transport, length, keep_alive=True):
+        self.transport = transport
+        self.remaining = length  # None when the body runs until the connection closes
+        self.keep_alive = keep_alive and length is not None
+
+    def readinto(self, buf):
+        """Fill buf with up to len(buf) body bytes, returns 0 at the end of the body"""
+        if self.remaining == 0 or self.transport.reader is None:
+            return 0
+        if self.remaining is not None and self.remaining < len(buf):
+            buf = memoryview(buf)[:self.remaining]
+        n = self.transport.reader.readinto(buf) or 0
+        if self.remaining is not None:
+            if not n:
+                self.transport.close()
+                raise OSError("connection closed mid-response")
+            self.remaining -= n
+        return n
+
+    def read(self, size=-1):
+        """Read size bytes of body, or the rest of it"""
+        if size is None or size < 0:
+            chunks = b""
+            while True:
+                chunk = self.read(256)
+                if not chunk:
+                    return chunks
+                chunks += chunk
+        buf = bytearray(size)
+        n = self.readinto(buf)
+        return bytes(buf[:n])
+
+    def drain(self):
+        """Discard what is left of the body so the connection can be reused"""
+        if not self.keep_alive:
+            self.transport.close()
+            return
+        buf = self.transport.scratch
+        while self.remaining:
+            self.readinto(buf)
+
+class Response:
+    """
+    Minimal response object compatible with the parts of urequests.Response
+    used by PowerGoblinManager (status_code, content, text, json, raw, close)
+    """
+    def __init__(self, status_code, content=None, raw=None):
+        self.status_code = status_code
+        self._content = content
+        self.raw = raw  # BodyReader for streamed responses
+
+    @property
+    def content(self):
+        if self._content is None:
+            self._content = self.raw.read() if self.raw is not None else b""
+        return self._content
+
+    @property
+    def text(self):
+        return str(self.content, "utf-8")
+
+    def json(self):
+        return json.loads(self.content)
+
+    def close(self):
+        """Finish reading a streamed body, the connection stays open for the next request"""
+        if self.raw is not None:
+            try:
+                self.raw.drain()
+            except OSError:
+                self.raw.transport.close()
+            self.raw = None
+
+class KeepAliveTransport:
+    """
+    HTTP/1.1 client that keeps a single persistent socket to one host
+    Responses are framed by Content-Length so the socket can be reused,
+    and the connection is re-established transparently when it drops
+    """
+    def __init__(self, host, port=80, timeout=None, base_path=""):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.sock = None
+        self.reader = None
+        self.connects = 0  # Number of TCP connections opened, useful for benchmarks
+        self._sent = False  # The last request was written out completely
+        
+        # Request heads are assembled in one reused buffer from pre-encoded pieces
+        self._buf = bytearray(512)
+        self._base_path = base_path.encode("utf-8")
+        self._host_line = b" HTTP/1.1\r\nHost: " + host.encode("utf-8") + b"\r\n"
+        self._content_types = {}
+        self.scratch = bytearray(128)  # Reused to discard unread response bodies
+
+    def connect(self):
+        """Open the TCP connection to the server"""
+        self.close()
+        addr = socket.getaddrinfo(self.host, self.port, 0, socket.SOCK_STREAM)[0][-1]
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        if self.timeout is not None:
+            sock.settimeout(self.timeout)
+        try:
+            sock.connect(addr)
+            if hasattr(socket, "TCP_NODELAY"):
+                # Small request/response pairs must not wait on Nagle's algorithm
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        except:
+            sock.close()
+            raise
+        self.sock = sock
+        self.reader = sock.makefile("rb")
+        self.connects += 1
+
+    def close(self):
+        """Close the persistent connection if one is open"""
+        for stream in (self.reader, self.sock):
+            if stream is not None:
+                try:
+                    stream.close()
+                except:
+                    pass
+        self.sock = None
+        self.reader = None
+
+    def request(self, method, path, body=None, content_type=None, stream=False, size=None,
+                idempotent=False):
+        """
+        Send a request over the persistent connection and return a Response
+        With stream=True the body is left on the socket and exposed through
+        response.raw; the response must be closed before the next request.
+        With size only the first size bytes of body are sent, so a reused
+        buffer can be passed as it is. When a reused connection fails, the
+        request is sent again on a new one only if it had not been written
+        out completely or it is idempotent; otherwise the server may already
+        have acted on it and the error is raised (PowerGoblin changes state
+        with GET requests as well, so the method does not tell).
+        """
+        reused = self.sock is not None
+        if not reused:
+            self.connect()
+        try:
+            return self._exchange(method, path, body, content_type, stream, size)
+        except OSError as e:
+            self.close()
+            if not reused or _is_timeout(e):
+                raise  # A slow server is not retried, that would double the wait
+            if self._sent and not idempotent:
+                raise  # The server may have acted on it, the caller's retry path decides
+        # The server closed an idle connection, retry once on a fresh socket
+        self.connect()
+        try:
+            return self._exchange(method, path, body, content_type, stream, size)
+        except:
+            self.close()
+            raise
+
+    def _exchange(self, method, path, body, content_type, stream=False, size=None):
+        """Write one request and read its response"""
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        if size is None and body is not None:
+            size = len(body)
+        self._sent = False
+        pos = self._put(0, method.encode("utf-8"))
+        pos = self._put(pos, b" ")
+        pos = self._put(pos, self._base_path)
+        pos = self._put(pos, path.encode("utf-8"))
+        pos = self._put(pos, self._host_line)
+        if body is not None:
+            if content_type:
+                pos = self._put(pos, self._content_type_line(content_type))
+            pos = self._put(pos, b"Content-Length: ")
+            pos = self._put(pos, str(size).encode("utf-8"))
+            pos = self._put(pos, b"\r\n")
+        pos = self._put(pos, b"\r\n")
+        
+        # One write per request keeps small requests in a single segment
+        # (a reused body buffer is copied whole, which needs no slice, but only size bytes are sent)
+        if size and pos + len(body) <= len(self._buf):
+            self._put(pos, body)
+            pos += size
+            body = None
+        self.sock.sendall(memoryview(self._buf)[:pos])
+        if size and body:
+            self.sock.sendall(body if size == len(body) else memoryview(body)[:size])
+        self._sent = True
+
+        status_code, length, keep_alive = self._read_head()
+        if stream:
+            return Response(status_code, raw=BodyReader(self, length, keep_alive))
+        if length is None:
+            # No framing information, the body runs until the server closes
+            content = self.reader.read()
+            keep_alive = False
+        else:
+            content = self._read_exact(length)
+        if not keep_alive:
+            self.close()
+        return Response(status_code, content)
+
+    def _put(self, pos, data):
+        """Copy data into the request buffer at pos, growing it only when too small"""
+        end = pos + len(data)
+        if end > len(self._buf):
+            self._buf.extend(bytearray(end - len(self._buf) + 64))
+        self._buf[pos:end] = data
+        return end
+
+    def _content_type_line(self, content_type):
+        """Encoded Content-Type header line, cached per content type"""
+        line = self._content_types.get(content_type)
+        if line is None:
+            line = self._content_types[content_type] = b"Content-Type: " + content_type.encode("utf-8") + b"\r\n"
+        return line
+
+    def _read_head(self):
+        """Read the status line and headers, returns (status, content length, keep alive)"""
+        line = self.reader.readline()
+        if not line:
+            raise OSError("connection closed by server")
+        parts = line.split(None, 2)
+        status_code = int(parts[1])
+        keep_alive = not parts[0].endswith(b"/1.0")
+        length = None
+        while True:
+            line = self.reader.readline()
+            if not line or line == b"\r\n":
+                break
+            name, _, value = line.partition(b":")
+            name = name.strip().lower()
+            if name == b"content-length":
+                length = int(value)
+            elif name == b"connection":
+                keep_alive = value.strip().lower() == b"keep-alive"
+        return status_code, length, keep_alive
+
+    def _read_exact(self, length):
+        """Read exactly length bytes of body from the connection"""
+        if length == 0:
+            return b""
+        content = self.reader.read(length)
+        while len(content) < length:
+            chunk = self.reader.read(length - len(content))
+            if not chunk:
+                raise OSError("connection closed mid-response")
+            content += chunk
+        return content
@@ -0,0 +1,158 @@
+from array import array
+
+# Byte values used by the tokenizer
+_QUOTE = 0x22
+_BACKSLASH = 0x5C
+_MINUS = 0x2D
+_ZERO = 0x30
+_NINE = 0x39
+_NUMBER_CHARS = b"0123456789.eE+-"
+_OPEN_ARRAY = 0x5B
+_CLOSE_ARRAY = 0x5D
+_OPEN_OBJECT = 0x7B
+_CLOSE_OBJECT = 0x7D
+
+# Container kinds on the parser's nesting stack
+_ARRAY = 1
+_ARRAY_OF_ARRAYS = 2  # Holds rows, its own value count is not checked
+_OBJECT = 3
+
+_MAX_TOKEN = 32  # Longest number accepted, in characters
+_MAX_DEPTH = 16
+
+def skip_bytes(stream, count, chunk_size=512):
+    """Read and discard count bytes of a stream, returns the number actually skipped"""
+    buf = bytearray(min(chunk_size, count) or 1)
+    view = memoryview(buf)
+    skipped = 0
+    while skipped < count:
+        n = stream.readinto(view[:min(len(buf), count - skipped)])
+        if not n:
+            break
+        skipped += n
+    return skipped
+
+def iter_number_blocks(stream, block_size=128, fields=2, typecode="d", chunk_size=256,
+                       positions=None, offset=0):
+    """
+    Parse the numbers in the arrays of a JSON document into fixed-size array blocks
+    The stream is read chunk_size bytes at a time with readinto, and every
+    number that is an array element, bare or quoted ("21.5", as the server
+    sends values), is stored in a preallocated array holding block_size
+    samples of fields values each (for power logs a sample is the row
+    [timestamp, value], so fields=2). Object values, other strings and
+    true/false/null are skipped, and a row with any other number of values
+    raises ValueError. Full blocks are yielded as the same array object
+    every time, so a caller that keeps blocks must copy them; the last,
+    partial block is yielded as a new, shorter array. Numbers are parsed
+    from one reused token buffer, and memory use stays constant no matter
+    how long the log is.
+    When positions is given (an array of at least block_size integers), the
+    stream offset of the first value of every sample in the current block
+    is stored at the sample's index in it, counting from offset for streams
+    whose first offset bytes were already consumed. Such a stream starts
+    inside the data array, which is why text outside any container is
+    treated as array content.
+    """
+    block = array(typecode, [0] * (block_size * fields))
+    size = len(block)
+    buf = bytearray(chunk_size)
+    token = bytearray(_MAX_TOKEN)
+    token_view = memoryview(token)
+    length = 0
+    stack = bytearray(_MAX_DEPTH)         # Container of each nesting level
+    starts = array("l", [0] * _MAX_DEPTH)  # Values parsed before each level opened
+    depth = 0
+    count = 0
+    values = 0
+    in_string = False
+    quoted = False    # The string being read may be a quoted number
+    escaped = False
+    in_number = False
+
+    while True:
+        n = stream.readinto(buf)
+        if not n:
+            break
+        base = offset
+        offset += n
+        for i in range(n):
+            c = buf[i]
+            if in_string:
+                if escaped:
+                    escaped = False
+                    quoted = False
+                elif c == _BACKSLASH:
+                    escaped = True
+                    quoted = False
+                elif c == _QUOTE:
+                    in_string = False
+                    if quoted and length:
+                        try:
+                            value = float(token_view[:length])
+                        except ValueError:
+                            continue  # A string like "e" or "-", not a number
+                        block[count] = value
+                        count += 1
+                        values += 1
+                        if count == size:
+                            yield block
+                            count = 0
+                elif quoted:
+                    if c in _NUMBER_CHARS and length < _MAX_TOKEN:
+                        token[length] = c
+                        length += 1
+                    else:
+                        quoted = False
+                continue
+            if in_number:
+                if c in _NUMBER_CHARS:
+                    if length == _MAX_TOKEN:
+                        raise ValueError("number too long")
+                    token[length] = c
+                    length += 1
+                    continue
+                in_number = False
+                block[count] = float(token_view[:length])
+                count += 1
+                values += 1
+                if count == size:
+                    yield block
+                    count = 0
+            in_array = depth == 0 or stack[depth - 1] != _OBJECT
+            if c == _QUOTE:
+                in_string = True
+                quoted = in_array
+                length = 0
+                if quoted and positions is not None and count % fields == 0:
+                    positions[count // fields] = base + i
+            elif c == _MINUS or _ZERO <= c <= _NINE:
+                if in_array:
+                    in_number = True
+                    if positions is not None and count % fields == 0:
+                        positions[count // fields] = base + i
+                    token[0] = c
+                    length = 1
+            elif c == _OPEN_ARRAY or c == _OPEN_OBJECT:
+                if depth == _MAX_DEPTH:
+                    raise ValueError("document nested too deeply")
+                if c == _OPEN_ARRAY and depth and stack[depth - 1] == _ARRAY:
+                    stack[depth - 1] = _ARRAY_OF_ARRAYS
+                stack[depth] = _ARRAY if c == _OPEN_ARRAY else _OBJECT
+                starts[depth] = values
+                depth += 1
+            elif c == _CLOSE_ARRAY or c == _CLOSE_OBJECT:
+                if not depth:
+                    continue  # Closes a container opened before the stream offset
+                depth -= 1
+                row = values - starts[depth]
+                if stack[depth] == _ARRAY and row and row != fields:
+                    raise ValueError(f"row of {row} values, expected {fields}")
+
+    if in_number:
+        block[count] = float(token_view[:length])
+        count += 1
+    # Only whole samples are returned
+    count -= count % fields
+    if count:
+        yield block[:count]
@@ -0,0 +1,178 @@
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+import time
+import main_with_power_monitoring as sh
+from main_with_power_monitoring import dm, bm, power_monitor
+from event_trace import MOTION, ALERT_END
+
+# Shared alert state between the sensor, display and alert tasks
+alert_state = False
+alert_length = 0
+alert_timer = 0
+
+async def button_task():
+    """Act on door button presses recorded by the button interrupt"""
+    while True:
+        sh.check_button_press()
+        await asyncio.sleep(0.02)
+
+async def sensor_task():
+    """Sample sensors into the shared cache and display temperature every 60 seconds"""
+    temp_log_timer = time.time()
+    while True:
+        if sh.sensors.poll():
+            sh.log_temperature()
+        if time.time() - temp_log_timer > 60:
+            temp_log_timer = time.time()
+            sh.report_temperature()
+        await asyncio.sleep(0.1)
+
+async def display_task():
+    """Update the rolling message display every 5 seconds during normal operation"""
+    while True:
+        await asyncio.sleep(5)
+        if not alert_state:
+            dm.rolling_message()
+
+async def drain_queue():
+    """Send the queued power events one record per slot, when this task does the sending"""
+    pgm = power_monitor.pgm
+    if power_monitor.worker is not None or not power_monitor.ready or pgm.queue is None:
+        return
+    while len(pgm.queue):
+        pgm.flush(1)
+        await asyncio.sleep(0)
+
+async def switch_run(label):
+    """
+    Stop the current power run and start the next one; the run transitions flush
+    the event queue first, which is drained here in slots so they find it empty
+    """
+    await drain_queue()
+    power_monitor.stop_power_run()
+    power_monitor.start_power_run(label)
+
+async def alert_task():
+    """Detect danger conditions and drive the warning signals"""
+    global alert_state, alert_length, alert_timer
+    while True:
+        current_time = time.time()
+        if not alert_state:
+            alert_state, alert_length = bm.detect_alert_state()
+
+            # If motion detected, log it for power monitoring
+            if alert_state and alert_length > 0:
+                sh.trace.record(MOTION, 0, alert_length)
+                power_monitor.log_motion_detected()
+                alert_timer = current_time
+                sh.alert_signal.start()
+
+                # If serious alert, start a new power run to measure emergency response
+                if alert_length >= 5:
+                    await switch_run("Emergency response")
+            await asyncio.sleep(0.1)
+        elif current_time - alert_timer < alert_length:
+            # Emergency is active, switch signal phases whose deadline has passed
+            sh.alert_signal.update()
+            await asyncio.sleep(0.05)
+        else:
+            # Alert is over, return to normal operation
+            alert_state = False
+            sh.alert_signal.stop()
+            sh.trace.record(ALERT_END)
+            await switch_run("Normal operation")
+            await asyncio.sleep(0.1)
+
+async def telemetry_task():
+    """Upload queued power events one request at a time"""
+    pgm = power_monitor.pgm
+    power_poll_timer = time.time()
+    while True:
+        if time.time() - power_poll_timer > sh.POWER_POLL_INTERVAL:
+            # Read the newly logged power samples into the run statistics
+            power_poll_timer = time.time()
+            power_monitor.poll_power()
+            await asyncio.sleep(0)
+        if power_monitor.worker is not None:
+            # The network worker thread does the sending, only release coalesced events here
+            power_monitor.poll()
+            await asyncio.sleep(0.2)
+            continue
+        if not power_monitor.ready:
+            # Lazy session setup, one request per slot
+            power_monitor.setup_step()
+            await asyncio.sleep(0.2)
+            continue
+        if pgm.queue is not None and pgm.queue.should_flush():
+            # Send a single record per slot so controls are serviced between requests
+            await drain_queue()
+        await asyncio.sleep(0.2)
+
+async def heap_task():
+    """Collect garbage in a slot of its own instead of inside a control task"""
+    while True:
+        sh.heap.idle()
+        await asyncio.sleep(0.1)
+
+async def run():
+    print("Starting smart house system with power monitoring (async)")
+
+    # Start power measurement
+    power_monitor.start_power_measurement()
+    power_monitor.start_power_run("Normal operation")
+
+    # Initialize display
+    dm.write_message("System active")
+
+    # Initialize door to closed state and fan based on door state
+    sh.control_door(sh.door_open)
+    sh.update_fan_state(not sh.door_open)
+
+    print("Starting control tasks")
+    await asyncio.gather(
+        button_task(),
+        sensor_task(),
+        display_task(),
+        alert_task(),
+        telemetry_task(),
+        heap_task(),
+    )
+
+def main():
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        # Clean shutdown on keyboard interrupt
+        print("Shutting down smart house system")
+        power_monitor.stop_power_measurement()
+
+        # Ensure fan is off and door is closed
+        sh.deactivate_fan()
+        sh.control_door(False)
+        power_monitor.close()
+        sh.trace.close()
+
+    except Exception as e:
+        # Log any errors and attempt to stop power measurement
+        print(f"Error in control tasks: {e}")
+        power_monitor.stop_power_measurement()
+
+        # Attempt to safely shutdown hardware
+        try:
+            sh.deactivate_fan()
+            sh.control_door(False)
+            power_monitor.close()
+            sh.trace.close()
+        except:
+            pass
+
+        raise
+
+if __name__ == "__main__":
+    if hasattr(asyncio, "gather"):
+        main()
+    else:
+        # Firmware without a usable uasyncio, fall back to the synchronous loop
+        sh.main()
@@ -3,6 +3,12 @@ import website_manager as wm
 import display_manager as dm
 import combine_btn_motion as bm
 from smarthouse_power_monitor import SmartHousePowerMonitor
+from button import DebouncedButton
+from sensor_service import SensorService
+from profiler import StageProfiler, NullProfiler
+from heap_monitor import HeapMonitor, NullHeapMonitor
+from alert_signal import AlertSignaller
+from event_trace import TraceRecorder, NullTrace, BUTTON, MOTION, TEMPERATURE, DOOR, FAN, ALERT_END
 import dht
 from machine import Pin, PWM
 import machine
@@ -10,34 +16,97 @@ import machine
 # Initialize DHT sensor for temperature readings
 dht_sensor = dht.DHT11(Pin(17))
 
+def read_dht_temperature():
+    """Take one DHT11 measurement, only called by the sensor service"""
+    dht_sensor.measure()
+    return dht_sensor.temperature()
+
+# Shared sensor cache, the DHT11 supports about one read per second
+sensors = SensorService()
+sensors.add("inside_temp", read_dht_temperature, 2000)
+sensors.add("outside_temp", lambda: 22, 60000, value=22)  # Placeholder - would come from external sensor
+
+# Inputs and outputs of the control loop recorded to flash for host replay when enabled
+TRACE_EVENTS = False
+trace = TraceRecorder("trace.bin", max_bytes=65536) if TRACE_EVENTS else NullTrace()
+
 # Initialize PowerGoblin integration (update with your PowerGoblin server address)
-power_monitor = SmartHousePowerMonitor(goblin_host="10.0.0.201:8080")
+# Events are queued and sent in batches so triggers never block the control loop,
+# and kept in an offline buffer while the server is unreachable. Requests share one
+# keep-alive connection and reuse their buffers to limit heap churn, telemetry replies
+# are checked by status only and their bodies discarded unread. Session setup is
+# lazy so the hardware and control loop start at once, a cached session is resumed.
+# A hung server costs at most one 1 s timeout before the circuit breaker or the
+# offline buffer takes over. With NET_THREAD all of this runs on a network worker
+# thread and the control loop only queues commands for it.
+NET_THREAD = True
+power_monitor = SmartHousePowerMonitor(goblin_host="10.0.0.201:8080", queue_events=True,
+                                       offline_buffer=64, keep_alive=True, low_alloc=True,
+                                       lazy=True, metadata_path="goblin_session.json",
+                                       timeout=1, threaded=NET_THREAD, fire_and_forget=True,
+                                       trace=trace)
+
+# The power samples logged since the last poll are read into the on-device run and
+# measurement statistics every POWER_POLL_INTERVAL seconds (on the network worker
+# when NET_THREAD is set)
+POWER_POLL_INTERVAL = 10
 
 # Initialize Fan Control Pins
 INA = PWM(Pin(27, Pin.OUT), 10000)  # INA corresponds to IN+
 INB = PWM(Pin(18, Pin.OUT), 10000)  # INB corresponds to IN-
 
 # Initialize Button for door control
-door_button = Pin(26, Pin.IN, Pin.PULL_UP)  # Button for opening/closing the door
+door_button = DebouncedButton(Pin(26, Pin.IN, Pin.PULL_UP))  # Button for opening/closing the door
 
 # Initialize PWM for Servo (Door control)
 door_servo = PWM(Pin(5))  
 door_servo.freq(50)
 
+# Control loop stage timings, reported every minute when enabled
+PROFILE_LOOP = False
+profiler = StageProfiler(report_interval_ms=60000) if PROFILE_LOOP else NullProfiler()
+
+# Garbage collection runs in the loop's idle slot rather than whenever an allocation
+# happens to trigger it, heap health is reported to PowerGoblin every minute
+MANAGE_HEAP = True
+heap = (HeapMonitor(pgm=power_monitor, report_interval_ms=60000, worker=power_monitor.worker)
+        if MANAGE_HEAP else NullHeapMonitor())
+
 # Global variables to track state
 door_open = False
 fan_active = False
 
 def read_temperature():
-    """Read temperature from DHT sensor"""
-    try:
-        dht_sensor.measure()
-        inside_temp = dht_sensor.temperature()
-        outside_temp = 22  # Placeholder - would come from external sensor
-        return inside_temp, outside_temp
-    except:
-        print("Error reading temperature")
-        return 20, 22  # Default values if read fails
+    """Latest cached temperatures, failed sensor reads keep the last good value"""
+    return sensors.value("inside_temp"), sensors.value("outside_temp")
+
+_traced_temperature = [None, None]
+_fed_samples = [None, None]  # Sensor timestamps of the samples already fed to the telemetry
+
+def log_temperature():
+    """Feed new temperature samples to the smoothed, deadbanded power monitoring telemetry"""
+    readings = [None, None]
+    for sensor, name in enumerate(("inside_temp", "outside_temp")):
+        # Each filter only sees its own sensor's new samples, not the cached value again
+        timestamp = sensors.timestamp(name)
+        if timestamp is None or timestamp == _fed_samples[sensor]:
+            continue
+        _fed_samples[sensor] = timestamp
+        reading = readings[sensor] = sensors.value(name)
+        # Only readings that changed are traced, replay holds the last one
+        if reading != _traced_temperature[sensor]:
+            _traced_temperature[sensor] = reading
+            trace.record(TEMPERATURE, sensor, reading)
+    if readings[0] is not None or readings[1] is not None:
+        power_monitor.log_temperature(readings[0], readings[1])
+
+def report_temperature():
+    """Show the cached temperature on the display"""
+    inside_temp, outside_temp = read_temperature()
+    if inside_temp is None:
+        print("No temperature reading yet")
+        return
+    dm.write_message(f"Out temp: {outside_temp}C\nIn temp: {inside_temp}C")
 
 def toggle_door_state():
     """Toggle the door state and update power monitoring"""
@@ -57,6 +126,7 @@ def toggle_door_state():
 
 def control_door(open_door):
     """Control the physical door servo"""
+    trace.record(DOOR, 1 if open_door else 0)
     if open_door:
         door_servo.duty(77)  # Door open (90 degrees)
         print("Door opened.")
@@ -68,6 +138,7 @@ def update_fan_state(active):
     """Update the fan state and log power changes"""
     global fan_active
     fan_active = active
+    trace.record(FAN, 1 if active else 0)
     
     # Physically control the fan
     if active:
@@ -106,12 +177,23 @@ def trigger_alert(alert_message):
     # Activate emergency signals
     bm.activate_brake_and_warning()
 
+def emergency_signals_on():
+    """Show the emergency message and activate brake light and buzzer"""
+    dm.force_message("Emergency stop!")
+    bm.activate_brake_and_warning()
+
+def emergency_signals_off():
+    """Clear brake light and buzzer"""
+    bm.clear_brake_light()
+    bm.stop_buzzer()
+
+# Emergency signals blink 500 ms on / 100 ms off, driven by deadlines instead of sleeps
+alert_signal = AlertSignaller(emergency_signals_on, emergency_signals_off)
+
 def check_button_press():
-    """Check if door button is pressed and handle the press"""
-    if door_button.value() == 0:  # Button pressed (active low)
-        time.sleep(0.01)  # Delay to debounce the button
-        while door_button.value() == 0:
-            pass  # Wait for button release
+    """Handle a door button press recorded by the button interrupt"""
+    if door_button.pressed():
+        trace.record(BUTTON)
         toggle_door_state()  # Toggle door state
         return True
     return False
@@ -132,6 +214,7 @@ def main():
     rolling_timer = time.time()
     alert_timer = time.time()
     temp_log_timer = time.time()
+    power_poll_timer = time.time()
     
     # Initialize door to closed state
     control_door(door_open)
@@ -144,18 +227,23 @@ def main():
     try:
         while True:
             current_time = time.time()
+            iteration_start = t = profiler.start()
             
             # Check for door button press
             button_pressed = check_button_press()
+            t = profiler.lap("button", t)
+            
+            # Sample sensors that are due into the shared cache, every new
+            # sample goes through the temperature telemetry filters
+            if sensors.poll():
+                log_temperature()
+            t = profiler.lap("sensors", t)
             
-            # Check and log temperature every 60 seconds
+            # Display temperature every 60 seconds
             if current_time - temp_log_timer > 60:
                 temp_log_timer = current_time
-                inside_temp, outside_temp = read_temperature()
-                power_monitor.log_temperature(inside_temp, outside_temp)
-                
-                # Update temperature display
-                dm.write_message(f"Out temp: {outside_temp}C\nIn temp: {inside_temp}C")
+                report_temperature()
+                t = profiler.lap("temperature", t)
             
             # Normal operation (no alert)
             if not alert_state:
@@ -163,40 +251,51 @@ def main():
                 if current_time - rolling_timer > 5:
                     rolling_timer = current_time
                     dm.rolling_message()
+                    t = profiler.lap("display", t)
                 
                 # Check for danger conditions
                 alert_state, alert_length = bm.detect_alert_state()
                 
                 # If motion detected, log it for power monitoring
                 if alert_state and alert_length > 0:
+                    trace.record(MOTION, 0, alert_length)
                     power_monitor.log_motion_detected()
                     alert_timer = current_time
+                    alert_signal.start()
                     
                     # If serious alert, start a new power run to measure emergency response
                     if alert_length >= 5:
                         power_monitor.stop_power_run()
                         power_monitor.start_power_run("Emergency response")
+                t = profiler.lap("alert_detect", t)
             
             # Alert handling
             else:
                 if current_time - alert_timer < alert_length:
-                    # Emergency is active
-                    dm.force_message("Emergency stop!")
-                    bm.activate_brake_and_warning()
-                    
-                    # Brief pause between warning signals
-                    time.sleep(0.5)
-                    
-                    # Clear signals
-                    bm.clear_brake_light()
-                    bm.stop_buzzer()
+                    # Emergency is active, switch signal phases whose deadline has passed
+                    alert_signal.update()
                 else:
                     # Alert is over, return to normal operation
                     alert_state = False
+                    alert_signal.stop()
+                    trace.record(ALERT_END)
                     
                     # Return to normal power run if we were in emergency
                     power_monitor.stop_power_run()
                     power_monitor.start_power_run("Normal operation")
+                t = profiler.lap("alert_signal", t)
+            
+            # Send queued power events once a batch is due
+            power_monitor.poll()
+            if current_time - power_poll_timer > POWER_POLL_INTERVAL:
+                power_poll_timer = current_time
+                power_monitor.poll_power()
+            t = profiler.lap("telemetry", t)
+            profiler.lap("iteration", iteration_start)
+            profiler.maybe_report()
+            
+            # Collect garbage now, while the loop would be sleeping anyway
+            heap.idle()
             
             # Small delay to prevent CPU overuse
             time.sleep(0.1)
@@ -209,6 +308,8 @@ def main():
         # Ensure fan is off and door is closed
         deactivate_fan()
         control_door(False)
+        power_monitor.close()
+        trace.close()
     
     except Exception as e:
         # Log any errors and attempt to stop power measurement
@@ -219,6 +320,8 @@ def main():
         try:
             deactivate_fan() 
             control_door(False)
+            power_monitor.close()
+            trace.close()
         except:
             pass
         
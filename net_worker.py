@@ -0,0 +1,132 @@
+"""
+Network worker thread for PowerGoblin I/O
+
+MicroPython and CPython both provide the low-level _thread module
+(CPython's threading is built on it), so the worker runs unchanged on the
+ESP32 and in the host simulation.
+"""
+import _thread
+import time
+
+def drop_command(commands, essential=(), expendable=()):
+    """
+    Make room in a full list of (method, args, kwargs) commands by removing the
+    oldest expendable one, else the oldest one that is not essential; returns
+    False if every command is essential and none was removed
+    """
+    victim = None
+    for i in range(len(commands)):
+        method = commands[i][0]
+        name = method if isinstance(method, str) else getattr(method, "__name__", "")
+        if name in expendable:
+            victim = i
+            break
+        if victim is None and name not in essential:
+            victim = i
+    if victim is None:
+        return False
+    commands.pop(victim)
+    return True
+
+class NetWorker:
+    """
+    Runs PowerGoblin calls on a thread of their own
+    The control loop hands over commands (method name or callable and
+    arguments) through a bounded, lock-protected queue and returns at once.
+    The worker thread calls them in order on target and runs idle() whenever
+    the queue is empty.
+    Commands wait until setup(), called repeatedly on the worker thread,
+    returns True. A full queue drops a command rather than block the caller:
+    the oldest expendable one, else the oldest that is not essential (both
+    given as method names); essential commands are never dropped.
+    """
+    def __init__(self, target, setup=None, idle=None, max_commands=32, idle_interval=0.05,
+                 essential=(), expendable=()):
+        self.target = target      # Object whose methods the commands call
+        self.setup = setup        # Callable returning True once commands may run
+        self.idle = idle          # Callable run when no commands are waiting
+        self.max_commands = max_commands
+        self.idle_interval = idle_interval  # Seconds to sleep between idle runs
+        self.essential = essential
+        self.expendable = expendable
+        self.commands = []
+        self.dropped = 0          # Commands discarded because the queue was full
+        self.errors = 0           # Commands that raised
+        self.running = False
+        self.busy = False         # A command or idle run is in progress
+        self._lock = _thread.allocate_lock()
+        self._stopped = True
+
+    def __len__(self):
+        return len(self.commands)
+
+    def start(self):
+        """Start the worker thread"""
+        if self.running:
+            return
+        self.running = True
+        self._stopped = False
+        _thread.start_new_thread(self._run, ())
+
+    def submit(self, method, *args, **kwargs):
+        """
+        Queue a call of target.method(*args, **kwargs), never blocks on the network
+        method may also be a callable, which is then called as it is.
+        """
+        with self._lock:
+            if (len(self.commands) >= self.max_commands
+                    and drop_command(self.commands, self.essential, self.expendable)):
+                self.dropped += 1
+            self.commands.append((method, args, kwargs))
+
+    def _take(self):
+        with self._lock:
+            if self.commands:
+                self.busy = True
+                return self.commands.pop(0)
+            return None
+
+    def _run(self):
+        try:
+            while self.running and self.setup is not None:
+                self.busy = True
+                ready = self._guard(self.setup)
+                self.busy = False
+                if ready:
+                    break
+                time.sleep(self.idle_interval)
+            while self.running:
+                command = self._take()
+                if command is None:
+                    self.busy = True
+                    if self.idle is not None:
+                        self._guard(self.idle)
+                    self.busy = False
+                    time.sleep(self.idle_interval)
+                    continue
+                method, args, kwargs = command
+                if isinstance(method, str):
+                    method = getattr(self.target, method)
+                self._guard(method, args, kwargs)
+                self.busy = False
+        finally:
+            self._stopped = True
+
+    def _guard(self, func, args=(), kwargs={}):
+        """Call func, a failing command must not kill the worker"""
+        try:
+            return func(*args, **kwargs)
+        except Exception as e:
+            self.errors += 1
+            print(f"Network worker error: {e}")
+            return None
+
+    def stop(self, timeout=5):
+        """Send the remaining commands for up to timeout seconds, then stop the thread"""
+        deadline = time.time() + timeout
+        while (self.commands or self.busy) and not self._stopped and time.time() < deadline:
+            time.sleep(self.idle_interval)
+        self.running = False
+        while not self._stopped and time.time() < deadline:
+            time.sleep(self.idle_interval)
+        return not self.commands
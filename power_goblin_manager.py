@@ -1,15 +1,155 @@
 import urequests as requests
 import ujson as json
 import time
+from array import array
+try:
+    import usocket as socket
+except ImportError:
+    import socket
+from event_queue import EventQueue
+from http_transport import KeepAliveTransport
+from ring_buffer import RingBuffer
+from json_stream import iter_number_blocks, skip_bytes
+from sample_cache import SampleCache
+from circuit_breaker import CircuitBreaker
+from clock import EPOCH_OFFSET
+import gateway_protocol
+
+# Record kinds shared by the event queue and the offline buffer
+TRIGGER = 1
+RESOURCE = 2
+MEASUREMENT_START = 3
+MEASUREMENT_STOP = 4
+RUN_START = 5
+RUN_STOP = 6
+
+_TRANSITIONS = {
+    MEASUREMENT_START: ("measurement", "start"),
+    MEASUREMENT_STOP: ("measurement", "stop"),
+    RUN_START: ("run", "start"),
+    RUN_STOP: ("run", "stop"),
+}
+
+# Reused request headers and trigger payload template
+_JSON_TYPE = 'application/json'
+_TEXT_TYPE = 'text/plain'
+_JSON_HEADERS = {'Content-Type': _JSON_TYPE}
+_TEXT_HEADERS = {'Content-Type': _TEXT_TYPE}
+_TRIGGER_TYPE = b'{"triggerType":"'
+_TRIGGER_UNIT = b'","unit":"'
+_TRIGGER_MESSAGE = b'","message":"'
+_TRIGGER_END = b'","type":"trigger"'
+_TRIGGER_TIMESTAMP = b',"timestamp":'
+
+# Trigger field values whose encoding is kept, types, units and messages mostly repeat
+_MAX_ENCODED = 32
+
+# Power logs with a polling cursor (and cache), the least recently polled is evicted beyond it
+_MAX_POLLED_LOGS = 8
 
 class PowerGoblinManager:
     """
     A MicroPython client for interacting with PowerGoblin API from ESP32
     Enables power measurement and monitoring for smart house applications
     """
-    def __init__(self, host="localhost:8080"):
+    def __init__(self, host="localhost:8080", queue_events=False, queue_size=32,
+                 flush_size=8, flush_age=5, keep_alive=False, offline_buffer=0,
+                 offline_path=None, retry_interval=10, low_alloc=False, timeout=5,
+                 retries=2, backoff=0.1, backoff_max=1.0, breaker_threshold=3,
+                 breaker_cooldown=None, fire_and_forget=False, unit="ESP32", gateway=None,
+                 power_cache=0, replay_batch=4):
         self.host = "http://" + host + "/api/v2/"
         self.session_id = "latest"  # Default to latest session
+        self.unit = unit  # Unit name of this device, used when a call does not give one
+        self.measurement_id = None  # Id the server gave the measurement last started
+        
+        # Gateway client mode: records are sent as UDP datagrams to a host gateway that
+        # forwards them to PowerGoblin, HTTP is only used for session calls and reads
+        self.gateway = None
+        if gateway:
+            gateway_host, _, gateway_port = gateway.partition(":")
+            self.gateway = socket.getaddrinfo(gateway_host, int(gateway_port or 9999), 0,
+                                              socket.SOCK_DGRAM)[0][-1]
+            self._udp = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self._datagram = bytearray(gateway_protocol.MAX_DATAGRAM)
+            self._sequence = 0
+        
+        # Socket timeout in seconds for connecting and each read, None waits forever
+        self.timeout = timeout
+        
+        # Idempotent reads are retried with exponential backoff starting at backoff seconds
+        self.retries = retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        
+        # After breaker_threshold failures in a row requests fail at once for the cool-down
+        if breaker_cooldown is None:
+            breaker_cooldown = retry_interval
+        self.breaker = CircuitBreaker(breaker_threshold, int(breaker_cooldown * 1000))
+        
+        # Telemetry calls whose result is never used only check the status line
+        self.fire_and_forget = fire_and_forget
+        
+        # Optional persistent HTTP/1.1 connection instead of one urequests connection per call
+        self.transport = None
+        if keep_alive:
+            hostname, _, port = host.partition(":")
+            self.transport = KeepAliveTransport(hostname, int(port) if port else 80,
+                                                timeout=timeout, base_path="/api/v2/")
+        
+        # Low-allocation mode: trigger payloads are serialized into one reused buffer
+        self.low_alloc = low_alloc
+        self._body = bytearray(256) if low_alloc else None
+        self._encoded = {}  # Field value -> UTF-8 bytes (empty if it needs escaping)
+        
+        # Optional event queue: triggers and resources are buffered and sent in batches
+        self.queue = None
+        if queue_events:
+            self.queue = EventQueue(max_size=queue_size, flush_size=flush_size, flush_age=flush_age)
+        
+        # Optional store-and-forward buffer used while the server is unreachable
+        self.online = True
+        self.retry_interval = retry_interval  # Seconds between reconnection attempts
+        self.retry_at = 0
+        self.offline = None
+        if offline_buffer:
+            self.offline = RingBuffer(capacity=offline_buffer, path=offline_path)
+        self.replay_batch = replay_batch  # Buffered records resent per call once back online
+        self.offline_discarded = 0  # Buffered records dropped because they could not be decoded
+        
+        # Incremental power log polling: per (measurement, meter, channel) the stream offset
+        # and timestamp of the last sample seen, and optionally a cache of the newest
+        # power_cache samples
+        self.power_cache = power_cache
+        self._cursors = {}
+        self._power_caches = {}
+        self._polled = []  # Cursor keys, least recently polled first (dicts keep no order here)
+        self.poll_failures = 0  # Power log polls that could not fetch the log
+    
+    @property
+    def session_id(self):
+        return self._session_id
+    
+    @session_id.setter
+    def session_id(self, session_id):
+        """Change session and precompute the URL prefixes used on every call"""
+        self._session_id = session_id
+        self._session_url = f"session/{session_id}"
+        prefix = self._session_url + "/"
+        self._prefix = prefix
+        self._trigger_url = prefix + "trigger"
+        self._resource_url = prefix + "resource/"
+        self._transition_urls = {}
+        for kind, (scope, action) in _TRANSITIONS.items():
+            self._transition_urls[kind] = f"{prefix}{scope}/{action}/"
+        self._meter_urls = {}
+    
+    def _meter_url(self, meter_id):
+        """URL prefix for one meter, computed once per session"""
+        url = self._meter_urls.get(meter_id)
+        if url is None:
+            url = self._meter_urls[meter_id] = f"{self._prefix}meter/{meter_id}/"
+        return url
     
     def _handle_response(self, response):
         """Process API response and extract result data"""
@@ -28,40 +168,107 @@ class PowerGoblinManager:
         finally:
             response.close()  # Important to avoid memory leaks in MicroPython
     
-    def get(self, url):
-        """Send a GET request to the PowerGoblin API"""
+    def _check_status(self, response):
+        """Fire-and-forget result: True on HTTP 200, the body is discarded unread"""
         try:
-            response = requests.get(self.host + url)
+            if response.status_code != 200:
+                print(f"Error: HTTP status {response.status_code}")
+                return None
+            return True
+        finally:
+            response.close()
+    
+    def _request(self, method, url, data=None, headers=None, stream=False, size=None,
+                 idempotent=False):
+        """
+        Send a request through the keep-alive transport or urequests, size limits data
+        Only idempotent requests are resent by the transport once they went out.
+        """
+        if self.transport is not None:
+            content_type = headers['Content-Type'] if headers else None
+            return self.transport.request(method, url, data, content_type, stream, size,
+                                          idempotent)
+        if size is not None:
+            data = bytes(data[:size])
+        if self.timeout is None:
+            # Older urequests versions do not accept a timeout
+            if method == "GET":
+                return requests.get(self.host + url)
+            return requests.post(self.host + url, headers=headers, data=data)
+        if method == "GET":
+            return requests.get(self.host + url, timeout=self.timeout)
+        return requests.post(
+            self.host + url,
+            headers=headers,
+            data=data,
+            timeout=self.timeout
+        )
+    
+    def _call(self, method, url, body, headers, label, attempts=1, forget=False, size=None,
+              idempotent=False):
+        """
+        Send a request guarded by the circuit breaker, retrying failures up to
+        attempts times with exponential backoff. The backoff sleeps, so more
+        than one attempt is only made off the control loop (see retries in
+        SmartHousePowerMonitor). With forget the response body is never read
+        into memory, only its status is checked.
+        """
+        delay = self.backoff
+        for attempt in range(attempts):
+            if attempt:
+                time.sleep(delay)
+                delay = min(delay * 2, self.backoff_max)
+            if not self.breaker.allow():
+                self.online = False  # Short-circuited, the server is known to be down
+                return None
+            try:
+                response = self._request(method, url, body, headers, forget, size, idempotent)
+            except Exception as e:
+                print(f"{label} error: {e}")
+                self._failed()
+                continue
+            if response.status_code >= 500:
+                # A failing server counts towards the breaker like an unreachable one
+                print(f"{label} error: HTTP status {response.status_code}")
+                response.close()
+                self._failed()
+                continue
+            self._succeeded()
+            if forget:
+                return self._check_status(response)
             return self._handle_response(response)
-        except Exception as e:
-            print(f"GET request error: {e}")
-            return None
+        return None
+    
+    def _succeeded(self):
+        self.online = True
+        self.breaker.success()
+    
+    def _failed(self):
+        self.online = False
+        self.breaker.failure()
+    
+    def health(self):
+        """Connection state and circuit breaker counters for monitoring"""
+        status = self.breaker.status()
+        status["online"] = self.online
+        return status
+    
+    def get(self, url, idempotent=False, forget=False):
+        """Send a GET request to the PowerGoblin API, idempotent requests are retried"""
+        return self._call("GET", url, None, None, "GET request",
+                          self.retries + 1 if idempotent else 1, forget, idempotent=idempotent)
             
-    def post_json(self, url, data):
+    def post_json(self, url, data, forget=False):
         """Send a POST request with JSON data to the PowerGoblin API"""
-        try:
-            response = requests.post(
-                self.host + url,
-                headers={'Content-Type': 'application/json'},
-                data=json.dumps(data)
-            )
-            return self._handle_response(response)
-        except Exception as e:
-            print(f"POST JSON error: {e}")
-            return None
+        return self._post(url, json.dumps(data), _JSON_HEADERS, "POST JSON", forget)
     
-    def post_text(self, url, text):
+    def post_text(self, url, text, forget=False):
         """Send a POST request with text data to the PowerGoblin API"""
-        try:
-            response = requests.post(
-                self.host + url,
-                headers={'Content-Type': 'text/plain'},
-                data=text
-            )
-            return self._handle_response(response)
-        except Exception as e:
-            print(f"POST text error: {e}")
-            return None
+        return self._post(url, text, _TEXT_HEADERS, "POST text", forget)
+    
+    def _post(self, url, body, headers, label, forget=False, size=None):
+        """Send an already serialized POST body, of which only size bytes when given"""
+        return self._call("POST", url, body, headers, label, forget=forget, size=size)
     
     # Session management
     def start_session(self):
@@ -73,80 +280,410 @@ class PowerGoblinManager:
     
     def get_session_info(self):
         """Get information about the current session"""
-        return self.get(f"session/{self.session_id}")
+        return self.get(self._session_url, idempotent=True)
     
     # Meter management
     def get_meters(self):
         """Get all available meters in the current session"""
-        return self.get(f"session/{self.session_id}/meter")
+        return self.get(self._prefix + "meter", idempotent=True)
     
     def toggle_meter(self, meter_id):
         """Toggle a specific meter on or off"""
-        return self.get(f"session/{self.session_id}/meter/{meter_id}/toggle")
+        return self.get(self._meter_url(meter_id) + "toggle")
     
     def add_meter(self, meter_id):
         """Add a meter to the current session"""
-        return self.get(f"session/{self.session_id}/meter/{meter_id}/add")
+        return self.get(self._meter_url(meter_id) + "add")
     
     def rename_meter_channel(self, meter_id, channel, name):
         """Rename a meter channel for better identification"""
-        return self.get(f"session/{self.session_id}/meter/{meter_id}/rename/{channel}/{name}")
+        return self.get(f"{self._meter_url(meter_id)}rename/{channel}/{name}", idempotent=True,
+                        forget=self.fire_and_forget)
     
     # Measurement control
-    def start_measurement(self, unit="ESP32", message=""):
+    def start_measurement(self, unit=None, message=""):
         """Start a new measurement from the ESP32"""
-        if message:
-            return self.post_text(f"session/{self.session_id}/measurement/start/{unit}", message)
-        else:
-            return self.get(f"session/{self.session_id}/measurement/start/{unit}")
+        self._flush_pending()
+        return self._submit(MEASUREMENT_START, (unit or self.unit, message))
     
-    def stop_measurement(self, unit="ESP32", message=""):
+    def stop_measurement(self, unit=None, message=""):
         """Stop the current measurement"""
-        if message:
-            return self.post_text(f"session/{self.session_id}/measurement/stop/{unit}", message)
-        else:
-            return self.get(f"session/{self.session_id}/measurement/stop/{unit}")
+        self._flush_pending()
+        return self._submit(MEASUREMENT_STOP, (unit or self.unit, message))
     
     def rename_measurement(self, name):
         """Rename the current measurement"""
-        return self.post_text(f"session/{self.session_id}/measurement/rename", name)
+        return self.post_text(self._prefix + "measurement/rename", name)
     
     # Run control 
-    def start_run(self, unit="ESP32", message=""):
+    def start_run(self, unit=None, message=""):
         """Start a new run within the current measurement"""
-        if message:
-            return self.post_text(f"session/{self.session_id}/run/start/{unit}", message)
-        else:
-            return self.get(f"session/{self.session_id}/run/start/{unit}")
+        self._flush_pending()
+        return self._submit(RUN_START, (unit or self.unit, message))
     
-    def stop_run(self, unit="ESP32", message=""):
+    def stop_run(self, unit=None, message=""):
         """Stop the current run"""
-        if message:
-            return self.post_text(f"session/{self.session_id}/run/stop/{unit}", message)
-        else:
-            return self.get(f"session/{self.session_id}/run/stop/{unit}")
+        self._flush_pending()
+        return self._submit(RUN_STOP, (unit or self.unit, message))
     
     # Trigger events
-    def create_trigger(self, trigger_type, message, unit="ESP32"):
+    def create_trigger(self, trigger_type, message, unit=None):
         """Create a trigger event during measurement"""
+        unit = unit or self.unit
+        if self.queue is not None:
+            self.queue.push(TRIGGER, (trigger_type, message, unit))
+            return True
+        return self._submit(TRIGGER, (trigger_type, message, unit))
+    
+    def _send_trigger(self, trigger_type, message, unit, timestamp=None):
+        """Post a trigger, carrying the original timestamp (as Unix time) when it was queued"""
+        if timestamp is not None:
+            timestamp += EPOCH_OFFSET
+        if self.low_alloc:
+            size = self._trigger_body(trigger_type, message, unit, timestamp)
+            if size:
+                return self._post(self._trigger_url, self._body, _JSON_HEADERS, "POST JSON",
+                                  self.fire_and_forget, size)
         trigger_data = {
             "triggerType": trigger_type,
             "unit": unit,
             "message": message,
             "type": "trigger"
         }
-        return self.post_json(f"session/{self.session_id}/trigger", trigger_data)
+        if timestamp is not None:
+            trigger_data["timestamp"] = timestamp
+        return self.post_json(self._trigger_url, trigger_data, self.fire_and_forget)
+    
+    def _trigger_body(self, trigger_type, message, unit, timestamp):
+        """
+        Serialize a trigger into the reused body buffer from the payload template
+        Returns the payload size, or 0 if a field needs JSON escaping
+        """
+        pos = self._write_field(0, _TRIGGER_TYPE, trigger_type)
+        if pos:
+            pos = self._write_field(pos, _TRIGGER_UNIT, unit)
+        if pos:
+            pos = self._write_field(pos, _TRIGGER_MESSAGE, message)
+        if not pos:
+            return 0
+        pos = self._write_body(pos, _TRIGGER_END)
+        if timestamp is not None:
+            pos = self._write_body(pos, _TRIGGER_TIMESTAMP)
+            pos = self._write_body(pos, str(timestamp).encode("utf-8"))
+        return self._write_body(pos, b"}")
+    
+    def _write_field(self, pos, part, value):
+        """Write a template part and a string value, returns 0 if the value needs escaping"""
+        data = self._encoded.get(value)
+        if data is None:
+            data = value.encode("utf-8")
+            for c in data:
+                if c < 0x20 or c == 0x22 or c == 0x5C:
+                    data = b""  # Control character, quote or backslash
+                    break
+            if len(self._encoded) >= _MAX_ENCODED:
+                self._encoded.clear()
+            self._encoded[value] = data
+        if not data:
+            return 0
+        pos = self._write_body(pos, part)
+        return self._write_body(pos, data)
+    
+    def _write_body(self, pos, data):
+        """Copy data into the body buffer at pos, growing it only when too small"""
+        end = pos + len(data)
+        if end > len(self._body):
+            self._body.extend(bytearray(end - len(self._body) + 64))
+        self._body[pos:end] = data
+        return end
     
     # Power data retrieval
     def get_power_data(self, measurement_id, meter_id, channel):
         """Get power readings for a specific meter and channel"""
-        return self.get(f"session/{self.session_id}/logs/power/{measurement_id}/{meter_id}/{channel}")
+        return self.get(f"{self._prefix}logs/power/{measurement_id}/{meter_id}/{channel}",
+                        idempotent=True)
+    
+    def stream_power_data(self, measurement_id, meter_id, channel, block_size=128, typecode="d"):
+        """Iterate over power readings in fixed-size [timestamp, value] array blocks"""
+        return self._stream(f"{self._prefix}logs/power/{measurement_id}/{meter_id}/{channel}",
+                            block_size, typecode)
     
     # Resource management
-    def add_custom_resource(self, resource, value, unit="ESP32"):
+    def add_custom_resource(self, resource, value, unit=None):
         """Add custom resource data to the measurement"""
-        return self.get(f"session/{self.session_id}/resource/{resource}/add/{value}/{unit}")
+        unit = unit or self.unit
+        if self.queue is not None:
+            self.queue.push(RESOURCE, (resource, value, unit))
+            return True
+        return self._submit(RESOURCE, (resource, value, unit))
+    
+    def _send_resource(self, resource, value, unit):
+        """Send a single custom resource value"""
+        return self.get(f"{self._resource_url}{resource}/add/{value}/{unit}",
+                        forget=self.fire_and_forget)
     
     def get_resource_data(self, measurement_id, unit, resource):
         """Get resource data for a measurement"""
-        return self.get(f"session/{self.session_id}/logs/resource/{measurement_id}/{unit}/{resource}")
+        return self.get(f"{self._prefix}logs/resource/{measurement_id}/{unit}/{resource}",
+                        idempotent=True)
+    
+    def stream_resource_data(self, measurement_id, unit, resource, block_size=128, typecode="d"):
+        """Iterate over resource data in fixed-size [timestamp, value] array blocks"""
+        return self._stream(f"{self._prefix}logs/resource/{measurement_id}/{unit}/{resource}",
+                            block_size, typecode)
+    
+    def _open_stream(self, url):
+        """Send a streamed GET guarded by the circuit breaker, returns the response or None"""
+        if not self.breaker.allow():
+            self.online = False
+            return None
+        try:
+            response = self._request("GET", url, stream=True, idempotent=True)
+        except Exception as e:
+            print(f"GET stream error: {e}")
+            self._failed()
+            return None
+        if response.status_code >= 500:
+            self._failed()
+        else:
+            self._succeeded()
+        if response.status_code != 200:
+            print(f"Error: HTTP status {response.status_code}")
+            response.close()
+            return None
+        return response
+    
+    def _stream(self, url, block_size, typecode):
+        """
+        Stream a log from the server without building the whole response in memory
+        Full blocks reuse one array, copy a block before keeping it past the next iteration
+        """
+        response = self._open_stream(url)
+        if response is None:
+            return
+        try:
+            yield from iter_number_blocks(response.raw, block_size, 2, typecode)
+        finally:
+            response.close()
+    
+    # Incremental power log polling
+    def poll_power_data(self, measurement_id, meter_id, channel, block_size=128, typecode="d"):
+        """
+        Iterate over the power samples logged since the previous poll of the same channel
+        PowerGoblin only serves whole logs, so the log is still downloaded, but the bytes
+        up to the last sample seen are discarded unparsed and only newer samples are
+        parsed and yielded, in blocks as from stream_power_data. With power_cache the
+        new samples are also kept in the channel's SampleCache.
+        """
+        key = (str(measurement_id), str(meter_id), str(channel))
+        cursor = self._cursor(key)
+        cache = self.cached_power_data(measurement_id, meter_id, channel)
+        if cache is None and self.power_cache:
+            cache = self._power_caches[key] = SampleCache(self.power_cache, typecode)
+        
+        response = self._open_stream(f"{self._prefix}logs/power/{measurement_id}/{meter_id}/{channel}")
+        if response is None:
+            self.poll_failures += 1
+            return
+        try:
+            offset, last_time = cursor
+            raw = response.raw
+            # The log only grows, so the last sample seen starts at the same offset
+            # again; it is parsed once more as an anchor to check exactly that
+            anchored = offset > 0
+            if anchored and skip_bytes(raw, offset) < offset:
+                cursor[0] = 0  # The log shrank, rescan it by timestamp next poll
+                return
+            positions = array("L", [0] * block_size)
+            for block in iter_number_blocks(raw, block_size, 2, typecode,
+                                            positions=positions, offset=offset):
+                samples = len(block) // 2
+                start = 0
+                if anchored:
+                    anchored = False
+                    if block[0] != last_time:
+                        cursor[0] = 0  # The log changed under the cursor, rescan it next poll
+                        return
+                    start = 1
+                elif last_time is not None and block[0] <= last_time:
+                    # Rescan without a valid offset, skip the samples seen by timestamp
+                    while start < samples and block[2 * start] <= last_time:
+                        start += 1
+                cursor[0] = positions[samples - 1]
+                cursor[1] = block[2 * samples - 2]
+                if start == samples:
+                    continue
+                new = block if start == 0 else block[2 * start:]
+                if cache is not None:
+                    cache.extend(new)
+                yield new
+        finally:
+            response.close()
+    
+    def _cursor(self, key):
+        """The polling cursor of a log, created (evicting the least recently polled) if new"""
+        cursor = self._cursors.get(key)
+        if cursor is None:
+            if len(self._polled) >= _MAX_POLLED_LOGS:
+                evicted = self._polled.pop(0)
+                del self._cursors[evicted]
+                self._power_caches.pop(evicted, None)
+            cursor = self._cursors[key] = [0, None]
+        else:
+            self._polled.remove(key)
+        self._polled.append(key)
+        return cursor
+    
+    def power_cursor(self, measurement_id, meter_id, channel):
+        """(stream offset, timestamp) of the last sample polled from a channel, None before a poll"""
+        cursor = self._cursors.get((str(measurement_id), str(meter_id), str(channel)))
+        return None if cursor is None else (cursor[0], cursor[1])
+    
+    def set_power_cursor(self, measurement_id, meter_id, channel, offset, last_time):
+        """Continue polling a channel from a saved power_cursor, e.g. in a later run"""
+        cursor = self._cursor((str(measurement_id), str(meter_id), str(channel)))
+        cursor[0] = offset
+        cursor[1] = last_time
+    
+    def cached_power_data(self, measurement_id, meter_id, channel):
+        """SampleCache of a polled channel, None without power_cache or before its first poll"""
+        return self._power_caches.get((str(measurement_id), str(meter_id), str(channel)))
+    
+    def reset_power_cursor(self, measurement_id, meter_id, channel):
+        """Forget the polling position and cache of a channel, the next poll starts over"""
+        key = (str(measurement_id), str(meter_id), str(channel))
+        if self._cursors.pop(key, None) is not None:
+            self._polled.remove(key)
+        self._power_caches.pop(key, None)
+    
+    # Event queue
+    def poll(self):
+        """Flush queued events when due and retry any buffered offline records"""
+        sent = 0
+        if self.queue is not None and self.queue.should_flush():
+            sent = self.flush()
+        if self.offline is not None and len(self.offline):
+            self.replay(self.replay_batch)
+        return sent
+    
+    def flush(self, max_records=None):
+        """Send queued events in their original order, returns the number sent"""
+        if self.queue is None:
+            return 0
+        batch = self.queue.take(max_records)
+        for timestamp, kind, args in batch:
+            self._submit(kind, args, timestamp)
+        return len(batch)
+    
+    def _flush_pending(self):
+        """Keep run and measurement transitions ordered after queued events"""
+        if self.queue is not None and len(self.queue):
+            self.flush()
+    
+    # Store and forward
+    def _send(self, kind, args, timestamp=None):
+        """Send one record of any kind to the server"""
+        if self.gateway is not None:
+            return self._send_datagram(kind, args, timestamp)
+        if kind == TRIGGER:
+            trigger_type, message, unit = args
+            return self._send_trigger(trigger_type, message, unit, timestamp)
+        if kind == RESOURCE:
+            resource, value, unit = args
+            return self._send_resource(resource, value, unit)
+        unit, message = args
+        url = self._transition_urls[kind] + unit
+        # The reply to a measurement start is its id, which the power log reads need
+        forget = self.fire_and_forget and kind != MEASUREMENT_START
+        if message:
+            result = self.post_text(url, message, forget)
+        else:
+            result = self.get(url, forget=forget)
+        if kind == MEASUREMENT_START and result is not None:
+            self.measurement_id = result
+        return result
+    
+    def _send_datagram(self, kind, args, timestamp):
+        """Send one record to the gateway, delivery is not acknowledged"""
+        if timestamp is None:
+            timestamp = time.time()
+        try:
+            size = gateway_protocol.encode_into(self._datagram, kind, self._sequence,
+                                                timestamp + EPOCH_OFFSET, args)
+        except ValueError as e:
+            print(f"Gateway record dropped: {e}")
+            return None
+        try:
+            self._udp.sendto(memoryview(self._datagram)[:size], self.gateway)
+        except OSError as e:
+            print(f"Gateway send error: {e}")
+            self.online = False
+            return None
+        self._sequence = (self._sequence + 1) & 0xFFFF
+        self.online = True
+        return True
+    
+    def submit(self, kind, args, timestamp=None):
+        """
+        Send a record of any kind (TRIGGER, RESOURCE, RUN_START, ...) with its fields,
+        or buffer it while the server is unreachable; used to forward records as they are
+        """
+        return self._submit(kind, tuple(args), timestamp)
+    
+    def _submit(self, kind, args, timestamp=None):
+        """Send a record, or store it for later if the server is unreachable"""
+        if self.offline is None:
+            return self._send(kind, args, timestamp)
+        if timestamp is None:
+            timestamp = time.time()
+        
+        # Older records must reach the server first to keep the timeline in order. Only a
+        # few are resent here so a long backlog does not stall the caller, poll() sends
+        # the rest and new records queue up behind them meanwhile.
+        if self.replay(self.replay_batch):
+            result = self._send(kind, args, timestamp)
+            if self.online:
+                return result
+            self.retry_at = time.time() + self.retry_interval
+        # Trigger and transition messages may be shortened, resource values may not
+        if not self.offline.push(kind, timestamp, args, None if kind == RESOURCE else 1):
+            print("Record too long for the offline buffer, dropped")
+        return None
+    
+    def replay(self, max_records=None):
+        """
+        Resend up to max_records (all if None) buffered records in order,
+        returns True once the buffer is empty
+        """
+        if self.offline is None:
+            return True
+        if not self.online and time.time() < self.retry_at:
+            return False  # Still waiting before the next connection attempt
+        while len(self.offline):
+            if max_records is not None:
+                if max_records <= 0:
+                    return False
+                max_records -= 1
+            try:
+                timestamp, kind, args = self.offline.peek()
+                self._send(kind, args, timestamp)
+            except (ValueError, UnicodeError, KeyError) as e:
+                # A corrupt record would block the buffer forever, drop it
+                print(f"Dropping unreadable offline record: {e}")
+                self.offline.discard()
+                self.offline_discarded += 1
+                continue
+            if not self.online:
+                self.retry_at = time.time() + self.retry_interval
+                return False
+            self.offline.discard()
+        return True
+    
+    def close(self):
+        """Release the persistent connection and offline buffer file, if any"""
+        if self.transport is not None:
+            self.transport.close()
+        if self.gateway is not None:
+            self._udp.close()
+        if self.offline is not None:
+            self.offline.close()
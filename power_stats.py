@@ -0,0 +1,75 @@
+class RunningStats:
+    """
+    Incremental statistics for one power channel in O(1) memory
+    Tracks count, min, max, mean and variance (Welford's method) and
+    integrates energy in Wh with the trapezoidal rule. Timestamps are
+    multiplied by time_unit to get seconds (1.0 for seconds, 0.001 for ms).
+    """
+    def __init__(self, time_unit=1.0):
+        self.time_unit = time_unit
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.mean = 0.0
+        self.min = float("inf")
+        self.max = float("-inf")
+        self.energy_wh = 0.0
+        self.first_time = None
+        self.last_time = None
+        self._m2 = 0.0
+        self._last_power = 0.0
+
+    def add(self, timestamp, power):
+        """Add one power sample in W taken at timestamp"""
+        self.count += 1
+        delta = power - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (power - self.mean)
+        if power < self.min:
+            self.min = power
+        if power > self.max:
+            self.max = power
+
+        if self.last_time is None:
+            self.first_time = timestamp
+        else:
+            dt = (timestamp - self.last_time) * self.time_unit
+            if dt > 0:
+                self.energy_wh += (power + self._last_power) * dt / 7200
+        self.last_time = timestamp
+        self._last_power = power
+
+    def add_block(self, block):
+        """Add a flat [timestamp, power, timestamp, power, ...] block of samples"""
+        add = self.add
+        for i in range(0, len(block) - 1, 2):
+            add(block[i], block[i + 1])
+
+    @property
+    def variance(self):
+        """Sample variance of the power readings"""
+        if self.count < 2:
+            return 0.0
+        return self._m2 / (self.count - 1)
+
+    @property
+    def duration(self):
+        """Seconds covered by the samples"""
+        if self.count < 2:
+            return 0.0
+        return (self.last_time - self.first_time) * self.time_unit
+
+    def summary(self):
+        """Current figures as a dict"""
+        if not self.count:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "min": self.min,
+            "max": self.max,
+            "mean": self.mean,
+            "variance": self.variance,
+            "duration_s": self.duration,
+            "energy_wh": self.energy_wh,
+        }
@@ -0,0 +1,121 @@
+from array import array
+from clock import ticks_us, ticks_ms, ticks_diff
+
+# Histogram layout: 4 linear buckets below 4 us, then 4 buckets per power of two
+# (about 25% resolution) up to 2^25 us, roughly 33 s
+_SUB_BUCKETS = 4
+_BUCKETS = 96
+
+def _bucket(us):
+    """Histogram bucket index for a duration in microseconds"""
+    if us < _SUB_BUCKETS:
+        return us if us > 0 else 0
+    bits = 0
+    value = us
+    while value:
+        value >>= 1
+        bits += 1
+    index = _SUB_BUCKETS * (bits - 2) + ((us >> (bits - 3)) & 3)
+    return index if index < _BUCKETS else _BUCKETS - 1
+
+def _bucket_limit(index):
+    """Upper bound in microseconds of a histogram bucket"""
+    if index < _SUB_BUCKETS:
+        return index
+    bits = index // _SUB_BUCKETS + 2
+    return ((_SUB_BUCKETS + index % _SUB_BUCKETS + 1) << (bits - 3)) - 1
+
+class StageProfiler:
+    """
+    Microsecond timings of named control loop stages in fixed-size histograms
+    Usage in the loop: t = profiler.start() ... t = profiler.lap("stage", t),
+    each lap charges the time since the previous lap to the named stage.
+    All counters live in preallocated arrays, recording a lap allocates
+    nothing once the stage is known. Percentiles are reported every
+    report_interval_ms to the console, or as PowerGoblin custom resources
+    when a PowerGoblinManager is given as pgm.
+    """
+    def __init__(self, report_interval_ms=60000, pgm=None, max_stages=12):
+        self.report_interval_ms = report_interval_ms
+        self.pgm = pgm
+        self.max_stages = max_stages
+        self.stages = {}  # Stage name -> row in the arrays
+        self.hist = array("L", [0] * (max_stages * _BUCKETS))
+        self.count = array("L", [0] * max_stages)
+        self.worst = array("L", [0] * max_stages)
+        self._last_report = ticks_ms()
+
+    def start(self):
+        """Timestamp to pass to the first lap of an iteration"""
+        return ticks_us()
+
+    def lap(self, stage, started):
+        """Charge the time since started to stage, returns the new timestamp"""
+        now = ticks_us()
+        row = self.stages.get(stage)
+        if row is None:
+            if len(self.stages) >= self.max_stages:
+                return now
+            row = self.stages[stage] = len(self.stages)
+        us = ticks_diff(now, started)
+        self.hist[row * _BUCKETS + _bucket(us)] += 1
+        self.count[row] += 1
+        if us > self.worst[row]:
+            self.worst[row] = us
+        return now
+
+    def percentile(self, stage, p):
+        """Upper bound of the p-th percentile (0-100) of a stage in microseconds"""
+        row = self.stages[stage]
+        target = self.count[row] * p / 100
+        seen = 0
+        base = row * _BUCKETS
+        for index in range(_BUCKETS):
+            seen += self.hist[base + index]
+            if seen and seen >= target:
+                return min(_bucket_limit(index), self.worst[row])
+        return self.worst[row]
+
+    def maybe_report(self):
+        """Report and reset the histograms once the report interval has elapsed"""
+        now = ticks_ms()
+        if ticks_diff(now, self._last_report) < self.report_interval_ms:
+            return False
+        self._last_report = now
+        self.report()
+        self.reset()
+        return True
+
+    def report(self):
+        """Send p50/p99/max per stage to PowerGoblin or print them"""
+        for stage, row in self.stages.items():
+            if not self.count[row]:
+                continue
+            p50 = self.percentile(stage, 50)
+            p99 = self.percentile(stage, 99)
+            if self.pgm is not None:
+                self.pgm.add_custom_resource(f"loop_{stage}_p50_us", str(p50))
+                self.pgm.add_custom_resource(f"loop_{stage}_p99_us", str(p99))
+            else:
+                print(f"{stage}: n={self.count[row]} p50={p50}us p99={p99}us max={self.worst[row]}us")
+
+    def reset(self):
+        """Clear all counters, keeping the known stages"""
+        for i in range(len(self.hist)):
+            self.hist[i] = 0
+        for i in range(self.max_stages):
+            self.count[i] = 0
+            self.worst[i] = 0
+
+class NullProfiler:
+    """
+    Drop-in replacement used when profiling is disabled, every call is a no-op
+    """
+    def start(self):
+        return 0
+
+    def lap(self, stage, started):
+        return 0
+
+    def maybe_report(self):
+        return False
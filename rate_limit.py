@@ -0,0 +1,118 @@
+from array import array
+from clock import ticks_ms, ticks_diff
+
+_OTHER = object()  # Held messages beyond max_messages
+
+class RateLimiter:
+    """
+    Token bucket per event type that coalesces suppressed events
+    Each type refills at rate tokens per second up to burst tokens. An event
+    that finds no token is counted instead of sent; the next event that gets
+    through (or flush_due once a token is back) carries the total count and
+    a message naming the latest event and how often each distinct message
+    occurred, so storms are bounded without losing what happened. Up to
+    max_messages distinct messages are told apart per type, the rest are
+    counted as other. Bucket state is kept in parallel arrays indexed by type.
+    """
+    def __init__(self, limits=None, default=(1.0, 2), max_types=8, max_messages=4):
+        self.default = default
+        self.max_types = max_types
+        self.max_messages = max_messages
+        self.types = {}  # Event type -> index into the arrays
+        self.rate = array("f", [0.0] * max_types)
+        self.burst = array("f", [0.0] * max_types)
+        self.tokens = array("f", [0.0] * max_types)
+        self.refilled = array("L", [0] * max_types)
+        self.suppressed = array("L", [0] * max_types)
+        self._last = [None] * max_types     # Latest message of each type
+        self.messages = [None] * max_types  # [message, count] pairs held back, first seen first
+        for event_type, (rate, burst) in (limits or {}).items():
+            self.configure(event_type, rate, burst)
+
+    def configure(self, event_type, rate, burst):
+        """Set the sustained rate (events per second) and burst size for an event type"""
+        index = self.types.get(event_type)
+        if index is None:
+            if len(self.types) >= self.max_types:
+                raise ValueError("too many event types")
+            index = self.types[event_type] = len(self.types)
+            self.tokens[index] = burst
+            self.refilled[index] = ticks_ms()
+        self.rate[index] = rate
+        self.burst[index] = burst
+        return index
+
+    def _refill(self, index, now):
+        elapsed = ticks_diff(now, self.refilled[index])
+        if elapsed > 0:
+            tokens = self.tokens[index] + elapsed * self.rate[index] / 1000
+            self.tokens[index] = tokens if tokens < self.burst[index] else self.burst[index]
+            self.refilled[index] = now
+
+    def hit(self, event_type, message=None):
+        """
+        Record an event, returns the message and the number of events the trigger to
+        send now represents, or a count of 0 if it was coalesced into a later one
+        """
+        index = self.types.get(event_type)
+        if index is None:
+            index = self.configure(event_type, *self.default)
+        self._hold(index, message)
+        self._refill(index, ticks_ms())
+        if self.tokens[index] < 1:
+            self.suppressed[index] += 1
+            return message, 0
+        self.tokens[index] -= 1
+        return self._release(index, message, 1)
+
+    def flush_due(self):
+        """Coalesced events whose bucket has refilled, as a list of (type, message, count)"""
+        due = []
+        now = ticks_ms()
+        for event_type, index in self.types.items():
+            if not self.suppressed[index]:
+                continue
+            self._refill(index, now)
+            if self.tokens[index] >= 1:
+                self.tokens[index] -= 1
+                message, count = self._release(index, self._last[index], 0)
+                due.append((event_type, message, count))
+        return due
+
+    def _hold(self, index, message):
+        """Count a message among the events of a type since its last trigger"""
+        self._last[index] = message
+        held = self.messages[index]
+        if held is None:
+            held = self.messages[index] = []
+        for entry in held:
+            if entry[0] == message:
+                entry[1] += 1
+                return
+        if len(held) < self.max_messages:
+            held.append([message, 1])
+        elif held[-1][0] is _OTHER:
+            held[-1][1] += 1
+        else:
+            # The last distinct slot becomes the count of all further messages
+            held[-1] = [_OTHER, held[-1][1] + 1]
+
+    def _release(self, index, message, sent):
+        """The message and count of a trigger carrying the held events and sent new ones"""
+        count = self.suppressed[index] + sent
+        held = self.messages[index]
+        self.suppressed[index] = 0
+        self.messages[index] = None
+        if count == 1 or held is None:
+            return message, count
+        if len(held) == 1:
+            return f"{message} (x{count})", count
+        parts = []
+        for text, n in held:
+            parts.append(f"{'other' if text is _OTHER else text} x{n}")
+        return f"{message} (x{count}: {', '.join(parts)})", count
+
+    def pending(self, event_type):
+        """Number of events of a type currently held back"""
+        index = self.types.get(event_type)
+        return self.suppressed[index] if index is not None else 0
@@ -0,0 +1,147 @@
+import struct
+
+_HEADER = "<HHHHI"  # capacity, slot size, head, count, dropped
+_HEADER_SIZE = struct.calcsize(_HEADER)
+_SLOT = "<BIH"      # kind, timestamp, payload length
+_SLOT_SIZE = struct.calcsize(_SLOT)
+_SEP = b"\x1f"      # Separates the string fields of a record
+
+def _utf8_prefix(data, length):
+    """The longest prefix of UTF-8 bytes data no longer than length that ends on a character"""
+    if length >= len(data):
+        return data
+    # Back off over continuation bytes (0b10xxxxxx) to the start of the cut character
+    while length > 0 and data[length] & 0xC0 == 0x80:
+        length -= 1
+    return data[:length]
+
+class RingBuffer:
+    """
+    Fixed-size store-and-forward buffer for telemetry records
+    Records live in a single preallocated bytearray of capacity slots of
+    slot_size bytes each, so memory use never grows. When the buffer is
+    full the oldest record is overwritten and counted in dropped. A record
+    too long for a slot is shortened in its truncate field (on a UTF-8
+    character boundary) when one is given, and otherwise rejected and
+    counted in rejected. With a path the buffer is mirrored to flash and
+    reloaded after a reboot.
+    """
+    def __init__(self, capacity=64, slot_size=64, path=None):
+        self.capacity = capacity
+        self.slot_size = slot_size
+        self.data = bytearray(capacity * slot_size)
+        self.head = 0      # Index of the oldest record
+        self.count = 0
+        self.dropped = 0   # Records lost to the drop-oldest policy
+        self.rejected = 0  # Records too long for a slot
+        self.path = path
+        self._file = None
+        if path:
+            self._open(path)
+
+    def __len__(self):
+        return self.count
+
+    def push(self, kind, timestamp, fields, truncate=None):
+        """
+        Append a record, overwriting the oldest one if the buffer is full
+        Returns False if the record does not fit in a slot even after shortening
+        fields[truncate], if given.
+        """
+        encoded = [str(field).encode("utf-8") for field in fields]
+        room = self.slot_size - _SLOT_SIZE
+        excess = sum(len(field) for field in encoded) + len(encoded) - 1 - room
+        if excess > 0 and truncate is not None and len(encoded[truncate]) >= excess:
+            encoded[truncate] = _utf8_prefix(encoded[truncate], len(encoded[truncate]) - excess)
+            excess = 0
+        if excess > 0:
+            self.rejected += 1
+            return False
+        payload = _SEP.join(encoded)
+        if self.count == self.capacity:
+            self.head = (self.head + 1) % self.capacity
+            self.count -= 1
+            self.dropped += 1
+        index = (self.head + self.count) % self.capacity
+        offset = index * self.slot_size
+        struct.pack_into(_SLOT, self.data, offset, kind, int(timestamp), len(payload))
+        start = offset + _SLOT_SIZE
+        self.data[start:start + len(payload)] = payload
+        self.count += 1
+        self._save_slot(index)
+        self._save_header()
+        return True
+
+    def peek(self):
+        """Return the oldest record as (timestamp, kind, fields) without removing it"""
+        if not self.count:
+            return None
+        offset = self.head * self.slot_size
+        kind, timestamp, length = struct.unpack_from(_SLOT, self.data, offset)
+        start = offset + _SLOT_SIZE
+        payload = bytes(self.data[start:start + length])
+        fields = tuple(str(field, "utf-8") for field in payload.split(_SEP))
+        return timestamp, kind, fields
+
+    def pop(self):
+        """Remove and return the oldest record"""
+        record = self.peek()
+        self.discard()
+        return record
+
+    def discard(self):
+        """Remove the oldest record without decoding it"""
+        if self.count:
+            self.head = (self.head + 1) % self.capacity
+            self.count -= 1
+            self._save_header()
+
+    def clear(self):
+        """Discard every pending record"""
+        self.head = 0
+        self.count = 0
+        self._save_header()
+
+    # Flash persistence
+    def _open(self, path):
+        """Reload a previous buffer from flash or create a new backing file"""
+        f = None
+        try:
+            f = open(path, "r+b")
+            header = f.read(_HEADER_SIZE)
+            capacity, slot_size, head, count, dropped = struct.unpack(_HEADER, header)
+            if capacity == self.capacity and slot_size == self.slot_size:
+                f.readinto(self.data)
+                self.head, self.count, self.dropped = head, count, dropped
+                self._file = f
+                return
+        except Exception:
+            pass
+        if f is not None:
+            f.close()
+        # Missing or incompatible file, start from an empty buffer
+        f = open(path, "w+b")
+        f.write(struct.pack(_HEADER, self.capacity, self.slot_size, 0, 0, 0))
+        f.write(self.data)
+        f.flush()
+        self._file = f
+
+    def _save_header(self):
+        if self._file is None:
+            return
+        self._file.seek(0)
+        self._file.write(struct.pack(_HEADER, self.capacity, self.slot_size,
+                                     self.head, self.count, self.dropped))
+        self._file.flush()
+
+    def _save_slot(self, index):
+        if self._file is None:
+            return
+        offset = index * self.slot_size
+        self._file.seek(_HEADER_SIZE + offset)
+        self._file.write(self.data[offset:offset + self.slot_size])
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,60 @@
+from array import array
+
+class SampleCache:
+    """
+    The newest [timestamp, value] samples of one log in a fixed-size ring
+    Storage is a single preallocated array of capacity samples; appending to
+    a full cache overwrites (evicts) the oldest samples, so memory stays
+    constant however long the log grows.
+    """
+    def __init__(self, capacity=256, typecode="d"):
+        self.capacity = capacity
+        self.typecode = typecode
+        self.data = array(typecode, [0] * (capacity * 2))
+        self.head = 0     # Slot of the oldest sample
+        self.count = 0
+        self.evicted = 0  # Samples overwritten since the cache was created
+
+    def __len__(self):
+        return self.count
+
+    def extend(self, block):
+        """Append a flat [timestamp, value, timestamp, value, ...] block of samples"""
+        capacity = self.capacity
+        samples = len(block) // 2
+        start = 0
+        if samples > capacity:
+            # Only the newest capacity samples can stay
+            start = samples - capacity
+            self.evicted += start
+        data = self.data
+        for i in range(start, samples):
+            if self.count == capacity:
+                slot = self.head
+                self.head = (self.head + 1) % capacity
+                self.evicted += 1
+            else:
+                slot = (self.head + self.count) % capacity
+                self.count += 1
+            data[2 * slot] = block[2 * i]
+            data[2 * slot + 1] = block[2 * i + 1]
+
+    def samples(self):
+        """Cached samples as a new flat array, oldest first"""
+        first = 2 * self.head
+        end = first + 2 * self.count
+        if end <= len(self.data):
+            return self.data[first:end]
+        out = self.data[first:]
+        out.extend(self.data[:end - len(self.data)])
+        return out
+
+    def last_time(self):
+        """Timestamp of the newest sample, None when empty"""
+        if not self.count:
+            return None
+        return self.data[2 * ((self.head + self.count - 1) % self.capacity)]
+
+    def clear(self):
+        self.head = 0
+        self.count = 0
@@ -0,0 +1,59 @@
+from clock import ticks_ms, ticks_diff, ticks_add
+
+# Slot layout of a registered sensor
+_READ = 0
+_INTERVAL = 1
+_VALUE = 2
+_TIMESTAMP = 3
+_DUE = 4
+_ERRORS = 5
+
+class SensorService:
+    """
+    Samples each registered sensor on its own schedule and caches the result
+    Consumers (display, telemetry, fan logic) read the cached value instead
+    of the hardware, so slow or rate-limited sensors such as the DHT11 are
+    never read more often than their interval. A failed read keeps the last
+    good value and only increments the sensor's error count.
+    """
+    def __init__(self):
+        self.sensors = {}
+
+    def add(self, name, read, interval_ms, value=None):
+        """Register a sensor read function, sampled at most every interval_ms"""
+        self.sensors[name] = [read, interval_ms, value, None, ticks_ms(), 0]
+
+    def poll(self):
+        """Sample every sensor whose interval has elapsed, returns the number sampled"""
+        now = ticks_ms()
+        sampled = 0
+        for slot in self.sensors.values():
+            if ticks_diff(now, slot[_DUE]) < 0:
+                continue
+            slot[_DUE] = ticks_add(now, slot[_INTERVAL])
+            try:
+                slot[_VALUE] = slot[_READ]()
+                slot[_TIMESTAMP] = now
+                sampled += 1
+            except Exception:
+                slot[_ERRORS] += 1
+        return sampled
+
+    def value(self, name):
+        """Last good value of a sensor (None before its first successful read)"""
+        return self.sensors[name][_VALUE]
+
+    def timestamp(self, name):
+        """Tick of the last good read, None if there was none; changes with every new sample"""
+        return self.sensors[name][_TIMESTAMP]
+
+    def age_ms(self, name):
+        """Milliseconds since the last good read, or None if there was none"""
+        timestamp = self.sensors[name][_TIMESTAMP]
+        if timestamp is None:
+            return None
+        return ticks_diff(ticks_ms(), timestamp)
+
+    def errors(self, name):
+        """Number of failed reads of a sensor"""
+        return self.sensors[name][_ERRORS]
@@ -1,42 +1,245 @@
-from power_goblin_manager import PowerGoblinManager
 import time
+import _thread
+import ujson as json
+from power_goblin_manager import PowerGoblinManager
+from power_stats import RunningStats
+from rate_limit import RateLimiter
+from net_worker import NetWorker, drop_command
+from deadband import DeadbandFilter
+from event_trace import NullTrace, TELEMETRY, TELEMETRY_CALLS
+
+# Meter "0" channels and the names they are given in PowerGoblin
+CHANNELS = (("0", "Main_Power"), ("1", "Motor_Power"), ("2", "LED_Power"))
+
+# Token bucket per trigger type: (sustained triggers per second, burst)
+DEFAULT_RATE_LIMITS = {
+    "Alert": (0.5, 1),
+    "Motion": (0.5, 1),
+    "DoorState": (1.0, 3),
+    "FanState": (1.0, 3),
+}
+
+# Calls never dropped from a full deferred or worker queue, later calls depend on them,
+# and the calls dropped first
+_ESSENTIAL_CALLS = ("start_measurement", "stop_measurement", "start_run", "stop_run",
+                    "_reset_stats", "_finish_run")
+_EXPENDABLE_CALLS = ("create_trigger",)
+
+# Session setup steps, channel renames follow _SETUP_RENAME one per step
+_SETUP_RESUME = 0
+_SETUP_SESSION = 1
+_SETUP_METERS = 2
+_SETUP_RENAME = 3
 
 class SmartHousePowerMonitor:
     """
     Integrates the smart house components with PowerGoblin power measurement
     """
-    def __init__(self, goblin_host="10.0.0.201:8080"):
-        self.pgm = PowerGoblinManager(host=goblin_host)
-        self.pgm.start_session()
+    def __init__(self, goblin_host="10.0.0.201:8080", rate_limits=None, lazy=False,
+                 metadata_path=None, max_deferred=32, threaded=False, temperature_deadband=0.5,
+                 temperature_alpha=0.3, temperature_interval=300, trace=None, **pgm_options):
+        # pgm_options are passed to PowerGoblinManager (queue_events, keep_alive, offline_buffer, ...)
+        # Without a network worker requests run on the control loop, where a backoff sleep
+        # between read attempts would stall it; failed setup reads are retried by deadline
+        if not threaded:
+            pgm_options.setdefault("retries", 0)
+        self.pgm = PowerGoblinManager(host=goblin_host, **pgm_options)
+        self.trace = trace if trace is not None else NullTrace()  # Records every telemetry call
         
-        # Set up meters
-        self.meters = self.pgm.get_meters()
-        if self.meters:
-            print(f"Available meters: {self.meters}")
+        # Session setup runs as a sequence of single-request steps. Lazy monitors do
+        # no network I/O here, setup advances in poll() or completes in ensure_ready(),
+        # and PowerGoblin calls made before then are deferred and replayed in order.
+        self.meters = None
+        self.ready = False           # Session set up and deferred calls replayed
+        self._session_ready = False  # Session set up, deferred calls may remain
+        self.metadata_path = metadata_path  # Cached session id and meters, skips setup on resume
+        self.max_deferred = max_deferred
+        self._deferred = []
+        self.deferred_dropped = 0    # Deferred calls dropped because the list was full
+        self._setup_step = _SETUP_RESUME
+        self._setup_retry_at = 0
+        self._session_key = None
+        self._metadata = self._load_metadata()
             
         # Initialize power tracking
         self.measurement_active = False
         self.run_active = False
         
-        # Track events for power correlation
-        self.last_alert_time = 0
+        # Track events for power correlation, bursts are coalesced per trigger type
+        limits = dict(DEFAULT_RATE_LIMITS)
+        if rate_limits:
+            limits.update(rate_limits)
+        self.limiter = RateLimiter(limits)
         self.last_door_state = False
         self.last_fan_state = False
         
-        # Rename channels for clarity
-        try:
+        # Smoothed temperatures are uploaded when they move by temperature_deadband C,
+        # or at least every temperature_interval seconds
+        self.temperature_filters = {}
+        for resource in ("temperature_inside", "temperature_outside"):
+            self.temperature_filters[resource] = DeadbandFilter(
+                temperature_deadband, temperature_alpha, temperature_interval * 1000)
+        
+        # Running power statistics per channel, for the current run and the whole measurement.
+        # A network worker feeds them on its thread while the control loop resets and reads
+        # them, every access holds the lock.
+        self._stats_lock = _thread.allocate_lock()
+        self._collecting_run = False  # Polled samples also go to run_stats
+        self.run_stats = {}
+        self.measurement_stats = {}
+        for channel, name in CHANNELS:
+            self.run_stats[name] = RunningStats()
+            self.measurement_stats[name] = RunningStats()
+        self.last_run_summary = None
+        
+        if not lazy:
+            self.ensure_ready()
+        
+        # Threaded monitors hand every PowerGoblin call to a network worker thread that
+        # owns the connection, runs the session setup and polls the manager's queues
+        self.worker = None
+        if threaded:
+            self.worker = NetWorker(self.pgm, setup=self.setup_step, idle=self.pgm.poll,
+                                    max_commands=max_deferred, essential=_ESSENTIAL_CALLS,
+                                    expendable=_EXPENDABLE_CALLS)
+            self.worker.start()
+    
+    def status(self):
+        """Setup state, dropped calls and connection counters for monitoring"""
+        return {
+            "ready": self.ready,
+            "deferred": len(self._deferred),
+            "dropped": self.deferred_dropped + (self.worker.dropped if self.worker else 0),
+            "connection": self.pgm.health(),
+        }
+    
+    def close(self, timeout=5):
+        """Send what the network worker still holds, then release the connection"""
+        if self.worker is not None:
+            self.worker.stop(timeout)
+        self.pgm.close()
+    
+    # Session setup
+    def setup_step(self):
+        """Run the next session setup request, returns True once setup is complete"""
+        if self.ready:
+            return True
+        if self._session_ready:
+            # Replay PowerGoblin calls made before the session existed, one per step
+            if self._deferred:
+                method, args, kwargs = self._deferred.pop(0)
+                getattr(self.pgm, method)(*args, **kwargs)
+            self.ready = not self._deferred
+            return self.ready
+        if time.time() < self._setup_retry_at:
+            return False  # Server was unreachable, wait before the next attempt
+        self._setup_retry_at = 0
+        
+        step = self._setup_step
+        if step == _SETUP_RESUME and self.pgm.gateway is not None:
+            # Units behind a gateway share the session the gateway's server runs
+            return self._setup_done(save=False)
+        if step == _SETUP_RESUME:
+            # A cached session that is still the server's current one needs no setup
+            if self._metadata is None:
+                self._setup_step = _SETUP_SESSION
+                return False
+            info = self.pgm.get_session_info()
+            if not self.pgm.online:
+                return self._setup_failed()
+            if isinstance(info, dict) and info.get("id") == self._metadata.get("session"):
+                print("Resuming cached PowerGoblin session")
+                self._session_key = self._metadata.get("session")
+                self.meters = self._metadata.get("meters")
+                return self._setup_done(save=False)
+            self._setup_step = _SETUP_SESSION
+        elif step == _SETUP_SESSION:
+            self.pgm.start_session()
+            if not self.pgm.online:
+                return self._setup_failed()
+            self._setup_step = _SETUP_METERS
+        elif step == _SETUP_METERS:
+            self.meters = self.pgm.get_meters()
+            if not self.pgm.online:
+                return self._setup_failed()
             if self.meters:
-                self.pgm.rename_meter_channel("0", "0", "Main_Power")
-                self.pgm.rename_meter_channel("0", "1", "Motor_Power")
-                self.pgm.rename_meter_channel("0", "2", "LED_Power")
-        except:
-            print("Could not rename meter channels")
+                print(f"Available meters: {self.meters}")
+            if self.metadata_path:
+                info = self.pgm.get_session_info()
+                self._session_key = info.get("id") if isinstance(info, dict) else None
+            self._setup_step = _SETUP_RENAME
+        else:
+            # Rename channels for clarity, one channel per step
+            index = step - _SETUP_RENAME
+            if not self.meters or index >= len(CHANNELS):
+                return self._setup_done()
+            channel, name = CHANNELS[index]
+            try:
+                self.pgm.rename_meter_channel("0", channel, name)
+            except:
+                print("Could not rename meter channels")
+            if not self.pgm.online:
+                return self._setup_failed()
+            self._setup_step = step + 1
+        return False
+    
+    def ensure_ready(self):
+        """Complete session setup now, returns False if the server could not be reached"""
+        while not self.ready:
+            self.setup_step()
+            if not self.ready and self._setup_retry_at:
+                return False
+        return True
+    
+    def _setup_failed(self):
+        self._setup_retry_at = time.time() + self.pgm.retry_interval
+        return False
+    
+    def _setup_done(self, save=True):
+        self._session_ready = True
+        if save and self._session_key is not None:
+            self._save_metadata()
+        self.ready = not self._deferred
+        return self.ready
+    
+    def _load_metadata(self):
+        if not self.metadata_path:
+            return None
+        try:
+            with open(self.metadata_path) as f:
+                return json.loads(f.read())
+        except Exception:
+            return None  # Missing or unreadable cache, set up from scratch
+    
+    def _save_metadata(self):
+        if not self.metadata_path:
+            return
+        try:
+            with open(self.metadata_path, "w") as f:
+                f.write(json.dumps({"session": self._session_key, "meters": self.meters}))
+        except OSError as e:
+            print(f"Could not save session metadata: {e}")
+    
+    def _call(self, method, *args, **kwargs):
+        """Call a PowerGoblinManager method, or defer it until session setup completes"""
+        self.trace.record(TELEMETRY, TELEMETRY_CALLS.get(method, 0))
+        if self.worker is not None:
+            self.worker.submit(method, *args, **kwargs)
+            return None
+        if self.ready:
+            return getattr(self.pgm, method)(*args, **kwargs)
+        if (len(self._deferred) >= self.max_deferred
+                and drop_command(self._deferred, _ESSENTIAL_CALLS, _EXPENDABLE_CALLS)):
+            self.deferred_dropped += 1
+        self._deferred.append((method, args, kwargs))
+        return None
     
     def start_power_measurement(self):
         """Start power measurement session"""
         if not self.measurement_active:
             print("Starting power measurement")
-            self.pgm.start_measurement(message="Smart house power monitoring")
+            self._call("start_measurement", message="Smart house power monitoring")
+            self._update_stats(self._reset_stats, self.measurement_stats)
             self.measurement_active = True
             return True
         return False
@@ -46,9 +249,10 @@ class SmartHousePowerMonitor:
         if self.measurement_active:
             print("Stopping power measurement")
             if self.run_active:
-                self.pgm.stop_run(message="Run ending with measurement")
+                self._update_stats(self._finish_run)
+                self._call("stop_run", message="Run ending with measurement")
                 self.run_active = False
-            self.pgm.stop_measurement(message="Smart house power monitoring complete")
+            self._call("stop_measurement", message="Smart house power monitoring complete")
             self.measurement_active = False
             return True
         return False
@@ -58,42 +262,123 @@ class SmartHousePowerMonitor:
         if self.measurement_active and not self.run_active:
             run_name = f"Smart house run{' - ' + label if label else ''}"
             print(f"Starting power run: {run_name}")
-            self.pgm.start_run(message=run_name)
+            self._call("start_run", message=run_name)
+            self._update_stats(self._reset_stats, self.run_stats, True)
             self.run_active = True
             return True
         return False
     
     def stop_power_run(self):
-        """Stop the current run"""
+        """Stop the current run, last_run_summary is set once its samples are in"""
         if self.run_active:
             print("Stopping power run")
-            self.pgm.stop_run(message="Smart house run complete")
+            self._update_stats(self._finish_run)
+            self._call("stop_run", message="Smart house run complete")
             self.run_active = False
             return True
         return False
     
+    def _update_stats(self, func, *args):
+        """
+        Run a statistics update on the network worker when there is one, so that it
+        keeps its order with the polls feeding the statistics
+        """
+        if self.worker is not None:
+            self.worker.submit(func, *args)
+        else:
+            func(*args)
+    
+    def _reset_stats(self, stats, run=False):
+        with self._stats_lock:
+            for channel_stats in stats.values():
+                channel_stats.reset()
+            if run:
+                self._collecting_run = True
+    
+    def _finish_run(self):
+        # Summarize the run from the running statistics, no log download needed. On the
+        # worker the samples logged since the last poll are fetched first.
+        if self.worker is not None:
+            self._poll_power(None, "0")
+        with self._stats_lock:
+            self._collecting_run = False
+        self.last_run_summary = summary = self.power_summary()
+        for name, channel in summary.items():
+            if channel["count"]:
+                print(f"{name}: mean {channel['mean']:.3f} W, {channel['energy_wh']:.4f} Wh")
+    
+    def add_power_samples(self, channel, block):
+        """Feed streamed [timestamp, power, ...] samples of a channel (id or name) into the statistics"""
+        for channel_id, name in CHANNELS:
+            if channel == channel_id or channel == name:
+                with self._stats_lock:
+                    if self._collecting_run:
+                        self.run_stats[name].add_block(block)
+                    self.measurement_stats[name].add_block(block)
+                return True
+        return False
+    
+    def poll_power(self, measurement_id=None, meter_id="0"):
+        """
+        Fetch the power samples logged since the last poll of every channel into the
+        statistics, returns the number of samples added. measurement_id defaults to
+        the measurement this monitor started. With a network worker the poll runs on
+        its thread and None is returned; before session setup it is skipped.
+        """
+        if self.worker is not None:
+            self.worker.submit(self._poll_power, measurement_id, meter_id)
+            return None
+        if not self.ready:
+            return 0
+        return self._poll_power(measurement_id, meter_id)
+
+    def _poll_power(self, measurement_id, meter_id):
+        if measurement_id is None:
+            measurement_id = self.pgm.measurement_id
+            if measurement_id is None:
+                return 0  # The measurement has not been started on the server yet
+        added = 0
+        for channel, name in CHANNELS:
+            if not self.pgm.online:
+                break  # Telemetry goes first while the server is unreachable
+            for block in self.pgm.poll_power_data(measurement_id, meter_id, channel):
+                self.add_power_samples(channel, block)
+                added += len(block) // 2
+        return added
+
+    def power_summary(self, per_run=True):
+        """Running statistics per channel for the current run or the whole measurement"""
+        source = self.run_stats if per_run else self.measurement_stats
+        with self._stats_lock:
+            return {name: stats.summary() for name, stats in source.items()}
+    
     def log_alert_event(self, alert_message):
         """Log a power event when an alert is triggered"""
-        current_time = time.time()
-        
-        # Prevent duplicate triggers in short timespan
-        if current_time - self.last_alert_time < 2:
+        count = self._limited_trigger("Alert", alert_message)
+        if not count:
             return False
-            
-        print(f"Logging alert power event: {alert_message}")
-        self.last_alert_time = current_time
+        
+        # Add custom resource data
+        self._call("add_custom_resource", "alert_count", str(count))
+        
+        return True
+    
+    def _limited_trigger(self, trigger_type, message):
+        """Create a rate-limited trigger, returns the number of events it carries (0 if held back)"""
+        message, count = self.limiter.hit(trigger_type, message)
+        if count:
+            self._send_trigger(trigger_type, message, count)
+        return count
+    
+    def _send_trigger(self, trigger_type, message, count):
+        """Create a trigger for count coalesced events of one type, message describes them all"""
+        print(f"Logging {trigger_type} power event: {message}")
         
         # Make sure measurement is active
         if not self.measurement_active:
             self.start_power_measurement()
             
-        # Create a trigger for this alert
-        self.pgm.create_trigger("Alert", alert_message)
-        
-        # Add custom resource data
-        self.pgm.add_custom_resource("alert_count", "1")
-        
-        return True
+        self._call("create_trigger", trigger_type, message)
     
     def log_door_state_change(self, door_open):
         """Log power consumption changes when door state changes"""
@@ -101,16 +386,9 @@ class SmartHousePowerMonitor:
             self.last_door_state = door_open
             
             door_state = "opened" if door_open else "closed"
-            print(f"Logging door state change: {door_state}")
             
-            # Make sure measurement is active
-            if not self.measurement_active:
-                self.start_power_measurement()
-                
             # Create a trigger for this door state change
-            self.pgm.create_trigger("DoorState", f"Door {door_state}")
-            
-            return True
+            return self._limited_trigger("DoorState", f"Door {door_state}") > 0
         return False
     
     def log_fan_state_change(self, fan_active):
@@ -119,46 +397,48 @@ class SmartHousePowerMonitor:
             self.last_fan_state = fan_active
             
             fan_state = "activated" if fan_active else "deactivated"
-            print(f"Logging fan state change: {fan_state}")
             
-            # Make sure measurement is active
-            if not self.measurement_active:
-                self.start_power_measurement()
-                
             # Create a trigger for this fan state change
-            self.pgm.create_trigger("FanState", f"Fan {fan_state}")
-            
-            return True
+            return self._limited_trigger("FanState", f"Fan {fan_state}") > 0
         return False
     
-    def log_temperature(self, inside_temp, outside_temp):
-        """Log temperature readings as resource data"""
-        if self.measurement_active:
-            print(f"Logging temperature data: Inside {inside_temp}C, Outside {outside_temp}C")
-            
-            # Add temperature data as custom resources
-            self.pgm.add_custom_resource("temperature_inside", str(inside_temp))
-            self.pgm.add_custom_resource("temperature_outside", str(outside_temp))
-            
-            return True
-        return False
+    def log_temperature(self, inside_temp=None, outside_temp=None):
+        """
+        Feed new temperature samples to the smoothing filters (None: no new sample from
+        that sensor) and log the smoothed values as resource data when they are due,
+        returns True if any was sent
+        """
+        if not self.measurement_active:
+            return False
+        sent = False
+        for resource, reading in (("temperature_inside", inside_temp),
+                                  ("temperature_outside", outside_temp)):
+            if reading is None:
+                continue
+            value = self.temperature_filters[resource].update(reading)
+            if value is not None:
+                print(f"Logging temperature data: {resource} {value:.1f}C")
+                self._call("add_custom_resource", resource, f"{value:.1f}")
+                sent = True
+        return sent
     
     def log_motion_detected(self):
         """Log when motion is detected"""
-        current_time = time.time()
-        
-        # Prevent duplicate triggers in short timespan
-        if current_time - self.last_alert_time < 2:
-            return False
-            
-        print("Logging motion detection power event")
-        self.last_alert_time = current_time
-        
-        # Make sure measurement is active
-        if not self.measurement_active:
-            self.start_power_measurement()
-            
-        # Create a trigger for motion detection
-        self.pgm.create_trigger("Motion", "Motion detected")
-        
-        return True
+        return self._limited_trigger("Motion", "Motion detected") > 0
+
+    def add_custom_resource(self, resource, value):
+        """Log a custom resource value (profiler and heap statistics) through the session"""
+        self._call("add_custom_resource", resource, value)
+
+    def poll(self):
+        """Send coalesced and queued power events that are due, call once per loop iteration"""
+        for trigger_type, message, count in self.limiter.flush_due():
+            self._send_trigger(trigger_type, message, count)
+            if trigger_type == "Alert":
+                self._call("add_custom_resource", "alert_count", str(count))
+        if self.worker is not None:
+            return 0  # Setup and queue flushing run on the network worker
+        if not self.ready:
+            self.setup_step()
+            return 0
+        return self.pgm.poll()
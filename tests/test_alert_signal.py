@@ -0,0 +1,31 @@
+import pytest
+
+import host  # noqa: F401  (sets up sys.path)
+import alert_signal
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000]
+    monkeypatch.setattr(alert_signal, "ticks_ms", lambda: now[0])
+    return now
+
+def test_phases_switch_at_their_deadlines(clock):
+    calls = []
+    signal = alert_signal.AlertSignaller(lambda: calls.append("on"), lambda: calls.append("off"))
+    signal.start()
+    clock[0] += 499
+    signal.update()
+    assert calls == ["on"]
+    clock[0] += 1
+    signal.update()
+    clock[0] += 100
+    signal.update()
+    assert calls == ["on", "off", "on"] and signal.active
+
+def test_stop_leaves_the_signals_cleared(clock):
+    calls = []
+    signal = alert_signal.AlertSignaller(lambda: calls.append("on"), lambda: calls.append("off"))
+    signal.start()
+    signal.stop()
+    signal.update()
+    assert calls == ["on", "off"] and not signal.active
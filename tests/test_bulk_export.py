@@ -0,0 +1,27 @@
+import json
+import os
+from array import array
+
+import host  # noqa: F401  (sets up sys.path)
+from host.fake_goblin import FakeGoblinServer
+from host.bulk_export import BulkExporter, MANIFEST
+
+def test_reexport_appends_only_new_samples(tmp_path):
+    out = str(tmp_path)
+    with FakeGoblinServer() as server:
+        first = BulkExporter(server.address, out, workers=2).export(["1", "2"], channels=["0"])
+        server.power_samples += 10
+        second = BulkExporter(server.address, out, workers=2).export(["1", "2"], channels=["0"])
+        third = BulkExporter(server.address, out, workers=2).export(["1", "2"], channels=["0"])
+    assert first["new_samples"] == 200 and second["new_samples"] == 20
+    assert third["new_samples"] == 0
+    with open(os.path.join(out, MANIFEST)) as f:
+        series = json.load(f)["series"]
+    # Only the older measurement is done, the newest one may still be recording
+    assert series["power/1/0/0"]["complete"] and not series["power/2/0/0"]["complete"]
+    entry = series["power/2/0/0"]
+    assert entry["samples"] == 110 and entry["cursor"][1] == entry["last_time"]
+    values = array("d")
+    with open(os.path.join(out, entry["file"]), "rb") as f:
+        values.frombytes(f.read())
+    assert list(values[0::2]) == [i * 0.1 for i in range(110)]
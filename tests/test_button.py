@@ -0,0 +1,47 @@
+import pytest
+
+import host  # noqa: F401  (sets up sys.path)
+import button
+from machine import Pin
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000]
+    monkeypatch.setattr(button, "ticks_ms", lambda: now[0])
+    return now
+
+def edge(btn, pin, level):
+    pin._level = level
+    btn._on_edge(pin)
+
+def test_press_counts_when_first_edge_reads_high(clock):
+    pin = Pin(90, Pin.IN, Pin.PULL_UP)
+    btn = button.DebouncedButton(pin)
+    edge(btn, pin, 1)  # Bounce: the falling edge reads high
+    for _ in range(4):
+        clock[0] += 10
+        edge(btn, pin, 0)
+    assert btn.pressed() and not btn.pressed()
+
+def test_release_bounce_is_not_a_press(clock):
+    pin = Pin(91, Pin.IN, Pin.PULL_UP)
+    btn = button.DebouncedButton(pin)
+    edge(btn, pin, 0)
+    clock[0] += 200
+    for level in (1, 0, 1, 0, 1):  # Release with bounce
+        edge(btn, pin, level)
+        clock[0] += 10
+    clock[0] += 100
+    edge(btn, pin, 0)  # Second press
+    assert btn.presses == 2
+
+def test_release_inside_bounce_window_is_recovered(clock):
+    pin = Pin(92, Pin.IN, Pin.PULL_UP)
+    btn = button.DebouncedButton(pin)
+    edge(btn, pin, 0)
+    clock[0] += 20
+    edge(btn, pin, 1)  # Very short press, the release edge is taken for bounce
+    clock[0] += 100
+    assert btn.pressed()
+    edge(btn, pin, 0)
+    assert btn.pressed()
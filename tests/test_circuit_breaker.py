@@ -0,0 +1,26 @@
+import time
+
+import host  # noqa: F401  (sets up sys.path)
+from host.fake_goblin import FakeGoblinServer
+from circuit_breaker import CircuitBreaker, OPEN, CLOSED
+from power_goblin_manager import PowerGoblinManager
+
+def test_half_open_breaker_lets_one_probe_through():
+    breaker = CircuitBreaker(threshold=1, cooldown_ms=50)
+    breaker.failure()
+    assert not breaker.allow()
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert not breaker.allow() and not breaker.allow()
+    breaker.success()
+    assert breaker.state == CLOSED and breaker.allow()
+
+def test_server_errors_trip_the_breaker():
+    with FakeGoblinServer() as server:
+        server.outage = "error"
+        pgm = PowerGoblinManager(host=server.address, keep_alive=True, breaker_threshold=3)
+        for _ in range(4):
+            pgm.get_meters()
+        pgm.close()
+    assert pgm.breaker.state == OPEN and pgm.breaker.trips == 1
+    assert server.refused == 3  # The first call tried 3 times, the others short-circuited
@@ -0,0 +1,14 @@
+import host  # noqa: F401  (sets up sys.path)
+from deadband import DeadbandFilter
+
+def test_only_changes_beyond_the_deadband_are_reported():
+    f = DeadbandFilter(deadband=0.5, alpha=0.5)
+    assert f.update(21.0) == 21.0
+    assert f.update(21.4) is None  # Smoothed to 21.2
+    assert f.update(21.2) is None
+    assert f.update(23.0) == 22.1
+
+def test_steady_value_is_repeated_after_the_interval():
+    f = DeadbandFilter(max_interval_ms=0)
+    assert f.update(21.0) == 21.0
+    assert f.update(21.0) == 21.0
@@ -0,0 +1,26 @@
+import host  # noqa: F401  (sets up sys.path)
+from net_worker import NetWorker
+from smarthouse_power_monitor import SmartHousePowerMonitor
+
+def test_full_deferred_list_keeps_lifecycle_calls():
+    monitor = SmartHousePowerMonitor(goblin_host="127.0.0.1:9", lazy=True, max_deferred=4)
+    monitor.start_power_measurement()
+    monitor.start_power_run()
+    monitor.log_door_state_change(True)
+    for value in "abc":
+        monitor.add_custom_resource("resource", value)
+    calls = [(method, args) for method, args, _ in monitor._deferred]
+    assert calls[:2] == [("start_measurement", ()), ("start_run", ())]
+    assert calls[2:] == [("add_custom_resource", ("resource", "b")),
+                         ("add_custom_resource", ("resource", "c"))]
+    assert monitor.status()["dropped"] == 2
+
+def test_worker_queue_never_drops_essential_commands():
+    worker = NetWorker(None, max_commands=2, essential=("start_run",))
+    worker.submit("start_run")
+    worker.submit("start_run")
+    worker.submit("create_trigger")
+    assert [method for method, _, _ in worker.commands] == ["start_run", "start_run",
+                                                            "create_trigger"]
+    worker.submit("create_trigger")
+    assert len(worker.commands) == 3 and worker.dropped == 1
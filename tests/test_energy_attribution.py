@@ -0,0 +1,25 @@
+import json
+from array import array
+
+import host  # noqa: F401  (sets up sys.path)
+from host.energy_attribution import DEVICE_EPOCHS, PowerSeries, attribute, load_triggers
+
+def test_step_after_event_is_attributed_to_it():
+    times = array("d", [i * 0.1 for i in range(201)])
+    watts = array("d", [1.0 if t < 10 else 3.0 for t in times])
+    results = attribute([(10.0, "Motion")], {"Main_Power": PowerSeries(times, watts)})
+    result, = results
+    assert abs(result["energy_wh"] * 3600 - 15) < 1e-6
+    # Baseline runs at 1 W, the +2 W step adds 10 J over the 5 s window
+    assert abs(result["delta_wh"] * 3600 - 10) < 0.2
+
+def test_triggers_fall_back_to_device_time_and_count_untimed(tmp_path):
+    path = tmp_path / "triggers.json"
+    path.write_text(json.dumps({"result": [
+        {"triggerType": "Motion", "time": 100.0},
+        {"triggerType": "Alert", "timestamp": 50},
+        {"triggerType": "Motion"},
+    ]}))
+    events, skipped = load_triggers(str(path), device_epoch="2000")
+    assert events == [(100.0, "Motion"), (50.0 + DEVICE_EPOCHS["2000"], "Alert")]
+    assert skipped == 1
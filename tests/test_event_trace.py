@@ -0,0 +1,40 @@
+import struct
+
+import host  # noqa: F401  (sets up sys.path)
+import event_trace
+from event_trace import (TraceRecorder, read_records, sessions, BUTTON, DOOR, START, REBASE,
+                         RECORD_SIZE)
+
+def pack(*records):
+    return b"".join(struct.pack("<IBBf", *record) for record in records)
+
+def test_rebase_and_restart_keep_times_increasing():
+    data = pack((0, START, 0, 0.0), (100, BUTTON, 0, 0.0), (1 << 28, REBASE, 0, 0.0),
+                (5, DOOR, 1, 0.0), (0, START, 0, 0.0), (40, BUTTON, 0, 0.0))
+    records = read_records(data)
+    assert [ms for ms, *_ in records] == [0, 100, (1 << 28) + 5, (1 << 28) + 5,
+                                          (1 << 28) + 45]
+    runs = sessions(records)
+    assert len(runs) == 2 and runs[1][0][1] == START
+
+def test_recorder_rebases_before_ticks_wrap(tmp_path, monkeypatch):
+    now = [0]
+    monkeypatch.setattr(event_trace, "ticks_ms", lambda: now[0])
+    path = str(tmp_path / "trace.bin")
+    recorder = TraceRecorder(path)
+    now[0] = 1 << 29  # Past the rebase interval, still a valid tick difference
+    recorder.record(BUTTON)
+    recorder.close()
+    with open(path, "rb") as f:
+        data = f.read()
+    assert len(data) == 3 * RECORD_SIZE
+    assert read_records(data)[-1][:2] == (1 << 29, BUTTON)
+
+def test_reopened_trace_starts_a_new_session(tmp_path):
+    path = str(tmp_path / "trace.bin")
+    for _ in range(2):
+        recorder = TraceRecorder(path)
+        recorder.record(BUTTON)
+        recorder.close()
+    with open(path, "rb") as f:
+        assert len(sessions(read_records(f.read()))) == 2
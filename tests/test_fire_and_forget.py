@@ -0,0 +1,15 @@
+import host  # noqa: F401  (sets up sys.path)
+from host.fake_goblin import FakeGoblinServer
+from power_goblin_manager import PowerGoblinManager
+
+def test_forgotten_replies_still_report_status():
+    with FakeGoblinServer() as server:
+        pgm = PowerGoblinManager(host=server.address, keep_alive=True, fire_and_forget=True)
+        pgm.start_measurement(message="test")
+        assert pgm.create_trigger("DoorState", "Door opened") is True
+        assert pgm.add_custom_resource("alert_count", "1") is True
+        assert pgm.get("no/such/path", forget=True) is None
+        pgm.close()
+    # The measurement start reply carries the id and is always read
+    assert pgm.measurement_id == server.measurements == 1
+    assert [trigger["message"] for _, trigger in server.triggers] == ["Door opened"]
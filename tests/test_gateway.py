@@ -0,0 +1,41 @@
+import socket
+import struct
+import time
+
+import pytest
+
+import host  # noqa: F401  (sets up sys.path)
+from host.fake_goblin import FakeGoblinServer
+from host.gateway import Gateway
+import gateway_protocol
+from power_goblin_manager import PowerGoblinManager, TRIGGER
+
+def test_decode_rejects_unknown_kind_and_missing_fields():
+    buf = bytearray(gateway_protocol.MAX_DATAGRAM)
+    size = gateway_protocol.encode_into(buf, 9, 0, 0.0, ("a", "b", "c"))
+    with pytest.raises(ValueError):
+        gateway_protocol.decode(buf[:size])
+    size = gateway_protocol.encode_into(buf, TRIGGER, 0, 0.0, ("Motion", "no unit"))
+    with pytest.raises(ValueError):
+        gateway_protocol.decode(buf[:size])
+
+def test_encode_rejects_oversize_record():
+    buf = bytearray(gateway_protocol.MAX_DATAGRAM)
+    with pytest.raises(ValueError):
+        gateway_protocol.encode_into(buf, TRIGGER, 0, 0.0, ("Motion", "x" * 300, "ESP32"))
+
+def test_bad_datagrams_do_not_stop_forwarding():
+    with FakeGoblinServer() as server:
+        with Gateway(server.address, bind="127.0.0.1", port=0, workers=1) as gateway:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            host_name, port = gateway.address.split(":")
+            header = struct.pack("<BBHd", gateway_protocol.VERSION, 9, 0, 0.0)
+            sock.sendto(header + b"a\x1fb", (host_name, int(port)))
+            unit = PowerGoblinManager(gateway=gateway.address, unit="house-1")
+            unit.create_trigger("Motion", "Motion detected")
+            deadline = time.time() + 5
+            while not server.triggers and time.time() < deadline:
+                time.sleep(0.01)
+            sock.close()
+        assert gateway.bad == 1
+        assert server.triggers[-1][1]["unit"] == "house-1"
@@ -0,0 +1,18 @@
+import host  # noqa: F401  (sets up sys.path)
+from heap_monitor import HeapMonitor
+
+class _Resources:
+    def __init__(self):
+        self.sent = {}
+
+    def add_custom_resource(self, resource, value):
+        self.sent[resource] = value
+
+def test_due_collection_is_reported_and_counters_reset():
+    resources = _Resources()
+    heap = HeapMonitor(pgm=resources, max_interval_ms=0, report_interval_ms=0)
+    assert heap.idle()
+    assert resources.sent["gc_collections"] == "1"
+    # Figures CPython does not report are left out rather than sent as None
+    assert "heap_free" not in resources.sent
+    assert heap.collections == 0 and heap.pause_max_us == 0
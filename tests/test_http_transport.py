@@ -0,0 +1,66 @@
+import socket
+import threading
+
+import pytest
+
+import host  # noqa: F401  (sets up sys.path)
+from http_transport import KeepAliveTransport
+
+class DroppingServer:
+    """Answers the first request of every connection, then reads one more and closes"""
+    def __init__(self):
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.bind(("127.0.0.1", 0))
+        self.listener.listen(4)
+        self.port = self.listener.getsockname()[1]
+        self.requests = []
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def _serve(self):
+        while True:
+            try:
+                conn, _ = self.listener.accept()
+            except OSError:
+                return
+            reader = conn.makefile("rb")
+            for answer in (True, False):
+                line = reader.readline()
+                if not line:
+                    break
+                length = 0
+                while True:
+                    header = reader.readline()
+                    if header in (b"\r\n", b""):
+                        break
+                    if header.lower().startswith(b"content-length:"):
+                        length = int(header.split(b":")[1])
+                self.requests.append(line.split()[0] + b" " + reader.read(length))
+                if answer:
+                    conn.sendall(b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\nok")
+            reader.close()
+            conn.close()
+
+    def close(self):
+        self.listener.close()
+
+@pytest.fixture
+def server():
+    server = DroppingServer()
+    yield server
+    server.close()
+
+def test_post_is_not_resent_after_connection_drop(server):
+    transport = KeepAliveTransport("127.0.0.1", server.port, timeout=2)
+    assert transport.request("GET", "session").status_code == 200
+    with pytest.raises(OSError):
+        transport.request("POST", "trigger", b"{}", "application/json")
+    transport.close()
+    assert server.requests == [b"GET ", b"POST {}"]
+
+def test_idempotent_request_is_resent_on_a_new_connection(server):
+    transport = KeepAliveTransport("127.0.0.1", server.port, timeout=2)
+    assert transport.request("GET", "session").status_code == 200
+    assert transport.request("GET", "meter", idempotent=True).content == b"ok"
+    transport.close()
+    assert server.requests == [b"GET ", b"GET ", b"GET "]
+    assert transport.connects == 2
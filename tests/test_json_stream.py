@@ -0,0 +1,36 @@
+import io
+
+import pytest
+
+import host  # noqa: F401  (sets up sys.path)
+from host.fake_goblin import FakeGoblinServer
+from json_stream import iter_number_blocks
+from power_goblin_manager import PowerGoblinManager
+
+def parse(doc, **options):
+    values = []
+    for block in iter_number_blocks(io.BytesIO(doc), block_size=2, **options):
+        values.extend(block)
+    return values
+
+def test_quoted_values_are_parsed():
+    doc = b'{"result": [[1, "21.5"], [2.5, "-3e2"], [3, 4]], "count": 7}'
+    assert parse(doc) == [1.0, 21.5, 2.5, -300.0, 3.0, 4.0]
+
+def test_row_with_wrong_number_of_values_raises():
+    with pytest.raises(ValueError):
+        parse(b'{"result": [[1, "n/a"], [2, 3]]}')
+
+def test_stream_starting_inside_the_data_array():
+    assert parse(b'0.5, 1.2], [0.6, 7]]}') == [0.5, 1.2, 0.6, 7.0]
+
+def test_resource_log_pairs_timestamps_with_values():
+    with FakeGoblinServer() as server:
+        pgm = PowerGoblinManager(host=server.address, keep_alive=True)
+        pgm.add_custom_resource("temperature_inside", "21.5")
+        pgm.add_custom_resource("temperature_inside", "22.0")
+        values = []
+        for block in pgm.stream_resource_data(1, "ESP32", "temperature_inside"):
+            values.extend(block)
+        pgm.close()
+    assert values[1::2] == [21.5, 22.0]
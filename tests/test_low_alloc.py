@@ -0,0 +1,17 @@
+import host  # noqa: F401  (sets up sys.path)
+from host.fake_goblin import FakeGoblinServer
+from power_goblin_manager import PowerGoblinManager
+
+MESSAGES = [("DoorState", "Door opened"), ("Alert", 'Sensor "inside" at 35C')]
+
+def sent_triggers(**options):
+    with FakeGoblinServer() as server:
+        pgm = PowerGoblinManager(host=server.address, keep_alive=True, **options)
+        for trigger_type, message in MESSAGES:
+            assert pgm.create_trigger(trigger_type, message)
+        pgm.close()
+    return [trigger for _, trigger in server.triggers]
+
+def test_low_alloc_triggers_match_the_default_path():
+    # The second message needs escaping and takes the dict path
+    assert sent_triggers(low_alloc=True) == sent_triggers()
@@ -0,0 +1,18 @@
+import host  # noqa: F401  (sets up sys.path)
+from host.fake_goblin import FakeGoblinServer
+import power_goblin_manager
+from power_goblin_manager import PowerGoblinManager
+
+def poll(pgm, channel):
+    return sum(len(block) // 2 for block in pgm.poll_power_data(1, 0, channel))
+
+def test_live_cursor_survives_eviction():
+    with FakeGoblinServer() as server:
+        pgm = PowerGoblinManager(host=server.address, keep_alive=True)
+        assert poll(pgm, "live") == server.power_samples
+        for channel in range(power_goblin_manager._MAX_POLLED_LOGS):
+            poll(pgm, channel)
+            assert poll(pgm, "live") == 0  # Still polled from its cursor, nothing new
+        server.power_samples += 5
+        assert poll(pgm, "live") == 5
+        pgm.close()
@@ -0,0 +1,31 @@
+import pytest
+
+import host  # noqa: F401  (sets up sys.path)
+from host.fake_goblin import FakeGoblinServer
+from smarthouse_power_monitor import SmartHousePowerMonitor
+
+@pytest.mark.parametrize("threaded", [False, True])
+def test_run_summary_holds_polled_samples(threaded):
+    with FakeGoblinServer() as server:
+        monitor = SmartHousePowerMonitor(goblin_host=server.address, keep_alive=True,
+                                         threaded=threaded)
+        monitor.start_power_measurement()
+        monitor.start_power_run("test")
+        monitor.poll_power()
+        monitor.stop_power_run()
+        monitor.close()
+    summary = monitor.last_run_summary["Main_Power"]
+    assert summary["count"] == server.power_samples
+    assert summary["mean"] > 0 and summary["energy_wh"] > 0
+    assert monitor.pgm.measurement_id == server.measurements == 1
+
+def test_repeated_polls_only_add_new_samples():
+    with FakeGoblinServer() as server:
+        monitor = SmartHousePowerMonitor(goblin_host=server.address, keep_alive=True)
+        monitor.start_power_measurement()
+        assert monitor.poll_power() == 3 * server.power_samples
+        assert monitor.poll_power() == 0
+        server.power_samples += 50
+        assert monitor.poll_power() == 3 * 50
+        monitor.close()
+    assert monitor.power_summary(per_run=False)["Main_Power"]["count"] == server.power_samples
@@ -0,0 +1,29 @@
+import host  # noqa: F401  (sets up sys.path)
+import profiler
+
+def test_laps_are_charged_to_their_stage(monkeypatch):
+    durations = iter([0, 3, 1003, 1003, 1006])
+    monkeypatch.setattr(profiler, "ticks_us", lambda: next(durations))
+    stages = profiler.StageProfiler()
+    t = stages.start()
+    t = stages.lap("sensors", t)
+    t = stages.lap("telemetry", t)
+    t = stages.start()
+    stages.lap("sensors", t)
+    assert stages.count[stages.stages["sensors"]] == 2
+    assert stages.percentile("sensors", 99) == 3
+    # A bucket bound is capped at the worst lap
+    assert stages.percentile("telemetry", 50) == 1000
+    stages.reset()
+    assert stages.count[stages.stages["telemetry"]] == 0
+
+def test_report_goes_to_custom_resources():
+    class Resources:
+        sent = {}
+        def add_custom_resource(self, resource, value):
+            self.sent[resource] = value
+    resources = Resources()
+    stages = profiler.StageProfiler(pgm=resources)
+    stages.lap("display", stages.start())
+    stages.report()
+    assert set(resources.sent) == {"loop_display_p50_us", "loop_display_p99_us"}
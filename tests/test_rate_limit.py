@@ -0,0 +1,26 @@
+import host  # noqa: F401  (sets up sys.path)
+from rate_limit import RateLimiter
+
+def test_coalesced_trigger_keeps_every_transition():
+    limiter = RateLimiter({"DoorState": (0.001, 1)})
+    assert limiter.hit("DoorState", "Door open") == ("Door open", 1)
+    for message in ("Door closed", "Door open", "Door closed", "Door open", "Door closed"):
+        assert limiter.hit("DoorState", message)[1] == 0
+    limiter.tokens[limiter.types["DoorState"]] = 1
+    assert limiter.flush_due() == [
+        ("DoorState", "Door closed (x5: Door closed x3, Door open x2)", 5)]
+
+def test_repeated_message_is_counted():
+    limiter = RateLimiter({"Motion": (0.001, 1)})
+    limiter.hit("Motion", "Motion detected")
+    limiter.hit("Motion", "Motion detected")
+    limiter.tokens[limiter.types["Motion"]] = 1
+    assert limiter.hit("Motion", "Motion detected") == ("Motion detected (x2)", 2)
+
+def test_distinct_messages_beyond_the_limit_count_as_other():
+    limiter = RateLimiter({"Alert": (0.001, 1)}, max_messages=2)
+    limiter.hit("Alert", "a")
+    for message in "bcdbe":
+        limiter.hit("Alert", message)
+    limiter.tokens[limiter.types["Alert"]] = 1
+    assert limiter.flush_due() == [("Alert", "e (x5: b x2, other x3)", 5)]
@@ -0,0 +1,65 @@
+import host  # noqa: F401  (sets up sys.path)
+from host.fake_goblin import FakeGoblinServer
+from power_goblin_manager import PowerGoblinManager, TRIGGER, RESOURCE
+from ring_buffer import RingBuffer
+
+def test_long_message_is_truncated_and_keeps_unit():
+    buf = RingBuffer(capacity=4, slot_size=64)
+    message = "Motion detected near the front door while nobody was home " * 2
+    assert buf.push(TRIGGER, 1, ("Motion", message, "ESP32"), truncate=1)
+    _, kind, (trigger_type, stored, unit) = buf.pop()
+    assert (kind, trigger_type, unit) == (TRIGGER, "Motion", "ESP32")
+    assert message.startswith(stored) and len(stored) < len(message)
+
+def test_truncation_ends_on_a_utf8_character():
+    buf = RingBuffer(capacity=4, slot_size=64)
+    assert buf.push(TRIGGER, 1, ("Alert", "ä" * 40, "ESP32"), truncate=1)
+    _, _, (_, stored, unit) = buf.pop()
+    assert set(stored) == {"ä"} and unit == "ESP32"
+
+def test_oversize_record_without_truncate_field_is_rejected():
+    buf = RingBuffer(capacity=4, slot_size=64)
+    assert not buf.push(RESOURCE, 1, ("resource", "9" * 80, "ESP32"))
+    assert len(buf) == 0 and buf.rejected == 1
+
+def test_long_trigger_replays_after_outage():
+    with FakeGoblinServer() as server:
+        server.outage = "refuse"
+        pgm = PowerGoblinManager(host=server.address, keep_alive=True, offline_buffer=8,
+                                 timeout=1, retry_interval=0)
+        pgm.create_trigger("Alert", "Intruder alert in the living room, sensors 1-4 " * 3)
+        assert len(pgm.offline) == 1
+        server.outage = None
+        pgm.breaker.success()
+        assert pgm.replay()
+        pgm.close()
+    trigger = server.triggers[-1][1]
+    assert trigger["unit"] == "ESP32" and trigger["message"].startswith("Intruder alert")
+
+def test_unreadable_record_is_dropped_instead_of_blocking_replay():
+    with FakeGoblinServer() as server:
+        pgm = PowerGoblinManager(host=server.address, offline_buffer=8)
+        pgm.offline.push(TRIGGER, 1, ("Motion", "missing unit"))
+        pgm.offline.push(RESOURCE, 2, ("alert_count", "1", "ESP32"))
+        assert pgm.replay()
+        assert pgm.offline_discarded == 1 and len(pgm.offline) == 0
+    assert server.resources[-1][1:] == ("alert_count", "1", "ESP32")
+
+def test_backlog_is_replayed_in_bounded_batches():
+    with FakeGoblinServer() as server:
+        pgm = PowerGoblinManager(host=server.address, offline_buffer=16, replay_batch=4)
+        for i in range(10):
+            pgm.offline.push(TRIGGER, i, ("Motion", f"queued {i}", "ESP32"))
+        pgm.create_trigger("Motion", "live")
+        assert len(server.triggers) == 4 and len(pgm.offline) == 7
+        while len(pgm.offline):
+            pgm.poll()
+    messages = [trigger["message"] for _, trigger in server.triggers]
+    assert messages == [f"queued {i}" for i in range(10)] + ["live"]
+
+def test_trigger_timestamp_is_unix_time():
+    with FakeGoblinServer() as server:
+        pgm = PowerGoblinManager(host=server.address, offline_buffer=4)
+        pgm.create_trigger("Motion", "Motion detected")
+    received, trigger = server.triggers[-1]
+    assert abs(trigger["timestamp"] - received) < 5
@@ -0,0 +1,34 @@
+import pytest
+
+import host  # noqa: F401  (sets up sys.path)
+import sensor_service
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000]
+    monkeypatch.setattr(sensor_service, "ticks_ms", lambda: now[0])
+    return now
+
+def test_sensor_is_read_once_per_interval(clock):
+    reads = []
+    sensors = sensor_service.SensorService()
+    sensors.add("temp", lambda: reads.append(1) or 21.5, 2000)
+    assert sensors.poll() == 1 and sensors.value("temp") == 21.5
+    clock[0] += 1999
+    assert sensors.poll() == 0
+    clock[0] += 1
+    assert sensors.poll() == 1 and len(reads) == 2
+
+def test_failed_read_keeps_last_good_value(clock):
+    values = [20.0]
+    def read():
+        if not values:
+            raise OSError("sensor timeout")
+        return values.pop()
+    sensors = sensor_service.SensorService()
+    sensors.add("temp", read, 1000)
+    sensors.poll()
+    clock[0] += 1000
+    assert sensors.poll() == 0
+    assert sensors.value("temp") == 20.0 and sensors.errors("temp") == 1
+    assert sensors.age_ms("temp") == 1000